@@ -1,12 +1,14 @@
 # engines/arxiv.py
 
-import requests
-# from datetime import datetime
+import asyncio
+from src import http_client
+from src.batching import BATCH_OVERFETCH, split_by_query
+from datetime import datetime
 from lxml import etree
 
 ARXIV_URL = (
     "https://export.arxiv.org/api/query"
-    "?search_query=all:{query}&start={offset}&max_results={limit}"
+    "?search_query={search_query}&start={offset}&max_results={limit}"
 )
 
 HEADERS = {
@@ -22,11 +24,32 @@ NAMESPACES = {
 #     "http": "http://87.248.129.32:80",  # Example from free-proxy-list.net
 # }
 
-def search_arxiv(query, page=1, limit=3):
+async def search_arxiv(query, page=1, limit=3):
     offset = (page - 1) * limit
-    url = ARXIV_URL.format(query=query, offset=offset, limit=limit)
-
-    resp = requests.get(url, headers=HEADERS)
+    return await _query(f"all:{query}", offset, limit)
+
+async def search_arxiv_many(queries, limit=3):
+    """
+    Search several terms with one boolean query, e.g. (all:black AND all:hole)
+    OR (all:quasar). Returns {query: results}; terms that none of the combined
+    results mention get their own search_arxiv call.
+    """
+    search_query = " OR ".join(
+        "(" + " AND ".join(f"all:{word}" for word in query.split()) + ")"
+        for query in queries
+    )
+    results = await _query(search_query, 0, limit * len(queries) * BATCH_OVERFETCH)
+    by_query = split_by_query(queries, results, lambda r: r["content"], limit)
+
+    missing = [query for query, found in by_query.items() if not found]
+    for query, found in zip(missing, await asyncio.gather(*(search_arxiv(q, limit=limit) for q in missing))):
+        by_query[query] = found
+    return by_query
+
+async def _query(search_query, offset, limit):
+    url = ARXIV_URL.format(search_query=search_query, offset=offset, limit=limit)
+
+    resp = await http_client.get(url, headers=HEADERS)
     # resp = requests.get(url, headers=HEADERS, proxies=proxies, timeout=10)
     if resp.status_code != 200:
         print("❌ arXiv request failed:", resp.status_code)
@@ -42,39 +65,34 @@ def search_arxiv(query, page=1, limit=3):
 
     for entry in dom.xpath('//atom:entry', namespaces=NAMESPACES):
         try:
-            # title = entry.xpath('.//atom:title', namespaces=NAMESPACES)[0].text.strip()
-            # summary = entry.xpath('.//atom:summary', namespaces=NAMESPACES)[0].text.strip()
+            title = ' '.join(entry.xpath('.//atom:title', namespaces=NAMESPACES)[0].text.split())
+            summary = entry.xpath('.//atom:summary', namespaces=NAMESPACES)[0].text.strip()
             url = entry.xpath('.//atom:id', namespaces=NAMESPACES)[0].text.strip()
-            pdf_url = url.replace('/abs/', '/pdf/') + '.pdf'
-            results.append(pdf_url)
-
-            # # Optional fields
-            # authors = [
-            #     a.text.strip() for a in entry.xpath('.//atom:author/atom:name', namespaces=NAMESPACES)
-            # ]
-            # published = entry.xpath('.//atom:published', namespaces=NAMESPACES)[0].text
-            # published_date = datetime.strptime(published, '%Y-%m-%dT%H:%M:%SZ')
-
-            # results.append({
-            #     "title": title,
-            #     "url": url,
-            #     "snippet": summary,
-            #     "source": "arXiv",
-            #     "authors": authors,
-            #     "published": published_date.strftime("%Y-%m-%d"),
-            # })
-
-            #results.append(url)
+            authors = [
+                a.text.strip() for a in entry.xpath('.//atom:author/atom:name', namespaces=NAMESPACES)
+            ]
+            published = entry.xpath('.//atom:published', namespaces=NAMESPACES)[0].text
+            published_date = datetime.strptime(published, '%Y-%m-%dT%H:%M:%SZ')
+
+            # the Atom summary is the abstract, no need to scrape the PDF for it
+            results.append({
+                "title": title,
+                "url": url,
+                "content": (
+                    f"{title}\n"
+                    f"{', '.join(authors)} ({published_date.strftime('%Y-%m-%d')})\n\n"
+                    f"{' '.join(summary.split())}"
+                ),
+            })
         except Exception:
             continue
 
     return results
 
 if __name__ == "__main__":
-    results = search_arxiv("reinforcement learning")
+    results = asyncio.run(search_arxiv("reinforcement learning"))
     #results = search_arxiv("tell me about what llms are")
     print(results)
 
     # Better with entity search
-    # Returns results as pdf urls 
-    # Use pdf extractor (later not MVP just jina for now)
\ No newline at end of file
+    # Returns the abstract (Atom summary) of each paper with its abs url
\ No newline at end of file
@@ -2,7 +2,9 @@
 Doesn't connect to the papers only gives extracts 
 
 """
-import requests
+import asyncio
+from src import http_client
+from src.batching import BATCH_OVERFETCH, split_by_query
 from datetime import datetime
 from urllib.parse import urlencode
 import os
@@ -14,21 +16,38 @@ ADS_API_KEY = os.getenv("HARVARD_ADS_API_KEY")
 ADS_BASE_URL = "https://api.adsabs.harvard.edu/v1/search/query"
 ADS_UI_BASE_URL = "https://ui.adsabs.harvard.edu/abs/"
 
-def search_ads(query, rows=5, page=1):
+async def search_ads(query, limit=5, page=1):
+    return await _query(query, limit, limit * (page - 1))
+
+async def search_ads_many(queries, limit=5):
+    """
+    Search several terms with one Solr OR query. Returns {query: results};
+    terms that none of the combined results mention get their own search_ads call.
+    """
+    combined = " OR ".join(f"({query})" for query in queries)
+    results = await _query(combined, limit * len(queries) * BATCH_OVERFETCH, 0)
+    by_query = split_by_query(queries, results, lambda r: f"{r['title']} {r['content']}", limit)
+
+    missing = [query for query, found in by_query.items() if not found]
+    for query, found in zip(missing, await asyncio.gather(*(search_ads(q, limit=limit) for q in missing))):
+        by_query[query] = found
+    return by_query
+
+async def _query(q, rows, start):
     headers = {
         "Authorization": f"Bearer {ADS_API_KEY}",
     }
 
     params = {
-        "q": query,
+        "q": q,
         "fl": "bibcode,author,title,abstract,doi,date",
         "rows": rows,
-        "start": rows * (page - 1),
+        "start": start,
     }
 
     url = f"{ADS_BASE_URL}?{urlencode(params)}"
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = await http_client.get(url, headers=headers, timeout=10)
         resp.raise_for_status()
         data = resp.json()
     except Exception as e:
@@ -52,33 +71,25 @@ def search_ads(query, rows=5, page=1):
         except ValueError:
             date = ""
 
-        # results.append({
-        #     "title": title,
-        #     "url": url,
-        #     "author": author,
-        #     "abstract": abstract,
-        #     "doi": doi,
-        #     "publishedDate": date
-        # })
-        results.append(url)
+        header = " | ".join(part for part in (author, date, f"doi: {doi}" if doi else "") if part)
+        results.append({
+            "title": title,
+            "url": url,
+            "content": f"{title}\n{header}\n\n{abstract}" if abstract else "",
+        })
 
     return results
 
 if __name__ == "__main__":
     #query = "black hole accretion"
     query = "pluto"
-    papers = search_ads(query)
-    print(papers)
-    # for i, paper in enumerate(papers, 1):
-    #     print(f"{i}. {paper['title']}")
-    #     print(f"   Author: {paper['author']}")
-    #     print(f"   Date: {paper['publishedDate']}")
-    #     print(f"   DOI: {paper['doi']}")
-    #     print(f"   URL: {paper['url']}")
-    #     print(f"   Abstract: {paper['abstract'][:300]}...\n")
+    papers = asyncio.run(search_ads(query))
+    for i, paper in enumerate(papers, 1):
+        print(f"{i}. {paper['url']}")
+        print(f"   {paper['content'][:300]}...\n")
 
 # search in entities
-# for now in mvp take urls and jina to scrape abstracts
+# returns the abstracts directly, jina only runs when one is missing
 
 # LATER AFTER MVP
 # don't scrape returns multiple results and abstracts 
@@ -1,5 +1,6 @@
 # engines/deviantart.py
-import requests
+import asyncio
+from src import http_client
 import urllib.parse
 from lxml import html
 
@@ -22,10 +23,10 @@ def extract_text(elements):
     return ""
 
 
-def search_deviantart(query, page=1):
+async def search_deviantart(query, page=1):
     url = SEARCH_URL.format(urllib.parse.urlencode({'q': query}))
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=20)
+        resp = await http_client.get(url, headers=HEADERS, timeout=20)
         if resp.status_code != 200:
             print("❌ DeviantArt request failed:", resp.status_code)
             return []
@@ -65,7 +66,7 @@ def search_deviantart(query, page=1):
 
 # ✅ CLI Test
 if __name__ == "__main__":
-    results = search_deviantart("anxiety")
+    results = asyncio.run(search_deviantart("anxiety"))
     #for r in results[:5]:
     #    print(r["text"])
     print(results)
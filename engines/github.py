@@ -1,10 +1,11 @@
-import requests
+import asyncio
+from src import http_client
 from urllib.parse import urlencode
 from dateutil import parser
 
-def search_github_repos(query, max_results=5):
+async def search_github_repos(query, limit=5):
     base_url = 'https://api.github.com/search/repositories'
-    query_url = f"{base_url}?{urlencode({'q': query, 'sort': 'stars', 'order': 'desc'})}"
+    query_url = f"{base_url}?{urlencode({'q': query, 'sort': 'stars', 'order': 'desc', 'per_page': limit})}"
 
     headers = {
         'Accept': 'application/vnd.github.preview.text-match+json',
@@ -12,7 +13,7 @@ def search_github_repos(query, max_results=5):
     }
 
     try:
-        res = requests.get(query_url, headers=headers, timeout=10)
+        res = await http_client.get(query_url, headers=headers, timeout=10)
         res.raise_for_status()
         data = res.json()
     except Exception as e:
@@ -20,7 +21,7 @@ def search_github_repos(query, max_results=5):
         return []
 
     results = []
-    for item in data.get('items', [])[:max_results]:
+    for item in data.get('items', [])[:limit]:
         name = item.get('full_name')
         description = item.get('description') or ''
         url = item.get('html_url')
@@ -39,7 +40,7 @@ def search_github_repos(query, max_results=5):
 
 if __name__ == "__main__":
     query = "langchain"
-    results = search_github_repos(query)
+    results = asyncio.run(search_github_repos(query))
     print(results)
     # if not results:
     #     print("No results found.")
@@ -2,7 +2,8 @@
 
 from urllib.parse import urlencode, quote_plus
 from lxml import html
-import requests
+import asyncio
+from src import http_client
 
 HEADERS = {
     "User-Agent": (
@@ -38,12 +39,15 @@ def request_goodreads(query, page=1):
 # --- RESPONSE PARSER FUNCTION ---
 from lxml import html
 
-def parse_goodreads(response_text):
+def parse_goodreads(response_text, limit=None):
     tree = html.fromstring(response_text)
     results = []
 
     rows = tree.xpath("//tr[@itemtype='http://schema.org/Book']")
     for row in rows:
+        # capped on kept results, malformed rows don't count
+        if limit is not None and len(results) >= limit:
+            break
         try:
             title_elem = row.xpath(".//a[contains(@class, 'bookTitle')]/span/text()")
             author_elem = row.xpath(".//a[contains(@class, 'authorName')]/span/text()")
@@ -59,18 +63,20 @@ def parse_goodreads(response_text):
             #     "snippet": info_elem[0].strip() if info_elem else "",
             #     "source": "Goodreads"
             # })
-            results.append("https://www.goodreads.com" + url_elem[0] if url_elem else None)
+            if not url_elem:
+                continue  # no link to scrape
+            results.append("https://www.goodreads.com" + url_elem[0])
         except Exception:
             continue  # Skip malformed rows
 
     return results
 
 # --- WRAPPER FUNCTION ---
-def search_goodreads(query, page=1):
+async def search_goodreads(query, page=1, limit=None):
     url = request_goodreads(query, page)
     #print(f"🔍 Requesting: {url}")  # log URL
 
-    resp = requests.get(url, headers=HEADERS)
+    resp = await http_client.get(url, headers=HEADERS)
     #print(f"✅ Status: {resp.status_code}")
 
     if resp.status_code != 200:
@@ -80,12 +86,12 @@ def search_goodreads(query, page=1):
     # Check what the HTML looks like
    # print("🧾 HTML Preview:", resp.text[:500])
 
-    results = parse_goodreads(resp.text)
+    results = parse_goodreads(resp.text, limit)
     #print(f"📦 Parsed {len(results)} results")
     return results
 
 if __name__ == "__main__":
-    results = search_goodreads("books about dogs")
+    results = asyncio.run(search_goodreads("books about dogs"))
     print(results)
 
     # if not results:
@@ -1,4 +1,5 @@
-import requests
+import asyncio
+from src import http_client
 import os
 from dotenv import load_dotenv
 
@@ -9,7 +10,7 @@ GOOGLE_CX = os.getenv("GOOGLE_SEARCH_CX")
 
 ENDPOINT = "https://www.googleapis.com/customsearch/v1"
 
-def search_google(query, count=5):
+async def search_google(query, count=5):
     if not GOOGLE_API_KEY or not GOOGLE_CX:
         raise ValueError("Missing GOOGLE_SEARCH_API_KEY or GOOGLE_SEARCH_CX in environment variables.")
 
@@ -20,7 +21,7 @@ def search_google(query, count=5):
         "num": count,
     }
 
-    resp = requests.get(ENDPOINT, params=params)
+    resp = await http_client.get(ENDPOINT, params=params)
     if resp.status_code != 200:
         print("❌ Failed:", resp.status_code, resp.text)
         return []
@@ -39,7 +40,7 @@ def search_google(query, count=5):
 
     return results
 
-def get_google_urls(query, count=5):
+async def get_google_urls(query, limit=5):
     """Get just the URLs from Google search results."""
     if not GOOGLE_API_KEY or not GOOGLE_CX:
         raise ValueError("Missing GOOGLE_SEARCH_API_KEY or GOOGLE_SEARCH_CX in environment variables.")
@@ -48,10 +49,12 @@ def get_google_urls(query, count=5):
         "key": GOOGLE_API_KEY,
         "cx": GOOGLE_CX,
         "q": query,
-        "num": count,
+        "num": limit,
+        # partial response: only the links are used
+        "fields": "items(link)",
     }
 
-    resp = requests.get(ENDPOINT, params=params)
+    resp = await http_client.get(ENDPOINT, params=params)
     if resp.status_code != 200:
         print("❌ Failed:", resp.status_code, resp.text)
         return []
@@ -69,6 +72,6 @@ if __name__ == "__main__":
     #for r in res:
     #    print(f"{r['title']}\n{r['url']}\n{r['snippet']}\n")
 
-    urls = get_google_urls("how to learn python")
+    urls = asyncio.run(get_google_urls("how to learn python"))
     #print("Found URLs:")
     print(urls)
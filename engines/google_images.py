@@ -1,7 +1,8 @@
-import requests
+import asyncio
+from src import http_client
 import json
 
-def google_image_search(query, pageno=1):
+async def google_image_search(query, pageno=1):
     headers = {
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -17,7 +18,7 @@ def google_image_search(query, pageno=1):
         f"&tbm=isch&asearch=isch&async=_fmt:json,p:1,ijn:{pageno - 1}"
     )
 
-    resp = requests.get(url, headers=headers)
+    resp = await http_client.get(url, headers=headers)
     if resp.status_code != 200:
         return []
 
@@ -52,7 +53,7 @@ def google_image_search(query, pageno=1):
 
 if __name__ == "__main__":
     query = "cute capybara"
-    results = google_image_search(query)
+    results = asyncio.run(google_image_search(query))
     print(results)
     # for r in results[:3]:
     #     print(f"🖼️ {r['title']}\n🔗 {r['page_url']}\n📷 {r['image_url']}\n")
@@ -1,6 +1,9 @@
 ## SORT BY DATE AND GET THE LATEST NEWS!!!!!!!
 
-import requests
+import asyncio
+import html
+import re
+from src import http_client
 from datetime import datetime
 from urllib.parse import urlencode
 from dateutil.relativedelta import relativedelta
@@ -8,7 +11,14 @@ from dateutil.relativedelta import relativedelta
 BASE_URL = "https://hn.algolia.com/api/v1"
 RESULTS_PER_PAGE = 10
 
-def search_hackernews(query: str, time_range: str = None, page: int = 1):
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _plain_text(text):
+    # Algolia returns story/comment text as HTML
+    return html.unescape(_TAGS.sub(" ", text or "")).strip()
+
+async def search_hackernews(query: str, time_range: str = None, page: int = 1, limit: int = RESULTS_PER_PAGE):
     search_type = "search"
     query_params = {}
 
@@ -22,7 +32,7 @@ def search_hackernews(query: str, time_range: str = None, page: int = 1):
         query_params = {
             "query": query,
             "page": page - 1,
-            "hitsPerPage": RESULTS_PER_PAGE,
+            "hitsPerPage": limit,
             "tagFilters": '["story"]',
         }
 
@@ -34,7 +44,7 @@ def search_hackernews(query: str, time_range: str = None, page: int = 1):
     full_url = f"{BASE_URL}/{search_type}?{urlencode(query_params)}"
 
     try:
-        resp = requests.get(full_url)
+        resp = await http_client.get(full_url)
         data = resp.json()
         results = []
 
@@ -44,15 +54,15 @@ def search_hackernews(query: str, time_range: str = None, page: int = 1):
             comments = hit.get("num_comments", 0)
             metadata = f"points: {points} | comments: {comments}" if points or comments else ""
 
-            # results.append({
-            #     "title": hit.get("title") or f"author: {hit.get('author')}",
-            #     "url": f"https://news.ycombinator.com/item?id={object_id}",
-            #     "content": hit.get("url") or hit.get("comment_text") or hit.get("story_text") or "",
-            #     "author": hit.get("author"),
-            #     "metadata": metadata,
-            #     "publishedDate": datetime.fromtimestamp(hit.get("created_at_i")),
-            # })
-            results.append(f"https://news.ycombinator.com/item?id={object_id}")
+            title = hit.get("title") or f"author: {hit.get('author')}"
+            # link stories have no text of their own, the caller scrapes those
+            text = _plain_text(hit.get("story_text") or hit.get("comment_text"))
+            header = " | ".join(part for part in (hit.get("url"), metadata) if part)
+            results.append({
+                "title": title,
+                "url": f"https://news.ycombinator.com/item?id={object_id}",
+                "content": f"{title}\n{header}\n\n{text}" if text else "",
+            })
 
         return results
 
@@ -62,14 +72,12 @@ def search_hackernews(query: str, time_range: str = None, page: int = 1):
 
 if __name__ == "__main__":
     #results = search_hackernews("can you please explain what is langchain?")
-    results = search_hackernews("langchain")
-    # for i, r in enumerate(results, 1):
-    #     print(f"{i}. {r['title']} by {r['author']}")
-    #     print(f"   {r['url']}")
-    #     print(f"   {r['metadata']}")
-    #     print(f"   {r['content'][:120]}...\n")
-    print(results)
+    results = asyncio.run(search_hackernews("langchain"))
+    for i, r in enumerate(results, 1):
+        print(f"{i}. {r['title']}")
+        print(f"   {r['url']}")
+        print(f"   {r['content'][:120]}...\n")
 # for now 
 # search entities 
-# get urls and use jina to scrape
+# Ask/Show HN text comes straight from Algolia, link stories still go through jina
 # to do later not in MVP change to pull most relevant + latest results!
\ No newline at end of file
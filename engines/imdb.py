@@ -1,18 +1,19 @@
 # TRY OMDB API if this breaks
 
 import json
-import requests
+import asyncio
+from src import http_client
 
 IMDB_SUGGESTION_URL = "https://v2.sg.media-imdb.com/suggestion/{letter}/{query}.json"
 IMDB_HREF_BASE = "https://imdb.com/{category}/{entry_id}"
 SEARCH_CATEGORIES = {"nm": "name", "tt": "title", "kw": "keyword", "co": "company", "ep": "episode"}
 
-def search_imdb(query):
+async def search_imdb(query, limit=None):
     query_key = query.replace(" ", "_").lower()
     url = IMDB_SUGGESTION_URL.format(letter=query_key[0], query=query_key)
 
     try:
-        response = requests.get(url, timeout=10)
+        response = await http_client.get(url, timeout=10)
         response.raise_for_status()
     except Exception as e:
         print(f"❌ Request failed: {e}")
@@ -22,6 +23,9 @@ def search_imdb(query):
     results = []
 
     for entry in suggestions.get('d', []):
+        # capped on kept results, skipped categories don't count
+        if limit is not None and len(results) >= limit:
+            break
         entry_id = entry.get('id')
         category = SEARCH_CATEGORIES.get(entry_id[:2])
         if not category:
@@ -61,7 +65,7 @@ def search_imdb(query):
 
 if __name__ == "__main__":
     query = "oppenheimer"
-    results = search_imdb(query)
+    results = asyncio.run(search_imdb(query))
     print(results)
     # for i, r in enumerate(results, 1):
     #     print(f"{i}. {r['title']}\n   {r['url']}\n   {r['content']}")
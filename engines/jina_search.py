@@ -1,4 +1,5 @@
-import requests
+import asyncio
+from src import http_client
 from urllib.parse import quote_plus  # helps safely encode the search query
 import os
 from dotenv import load_dotenv
@@ -8,7 +9,7 @@ load_dotenv()
 
 api_key = os.getenv("JINA_API_KEY")
 
-def jina_search(query: str):
+async def jina_search(query: str, limit: int = None):
     encoded_query = quote_plus(query)  # converts spaces to +, encodes special characters
     url = f"https://s.jina.ai/?q={encoded_query}"
 
@@ -19,15 +20,14 @@ def jina_search(query: str):
         "X-Retain-Images": "none"
     }
 
-    response = requests.get(url, headers=headers)
-    return response
+    response = await http_client.get(url, headers=headers)
+    response.raise_for_status()
+    return response.json().get("data", [])[:limit]
 
 if __name__ == "__main__":
     query = "hair"
-    response = jina_search(query)
-    if response.status_code == 200:
-        results = response.json().get("data", [])
-    
+    results = asyncio.run(jina_search(query))
+    if results:
         info = []
         for result in results:
             if result.get("content", "") == "":
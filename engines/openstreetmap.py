@@ -1,18 +1,18 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Simplified OpenStreetMap integration for chatbot."""
 
-import requests
+import asyncio
+from src import http_client
 from urllib.parse import urlencode
 
-def search_osm(query, language='en'):
+async def search_osm(query, language='en', limit=10):
     base_url = 'https://nominatim.openstreetmap.org/search'
     params = {
         'q': query,
         'format': 'jsonv2',
-        'addressdetails': 1,
-        'extratags': 1,
+        # only name and coordinates are used, so no address/extratags/polygons
         'dedupe': 1,
-        'polygon_geojson': 1,
+        'limit': limit,
         'accept-language': language
     }
 
@@ -21,7 +21,7 @@ def search_osm(query, language='en'):
     }
 
     try:
-        res = requests.get(base_url, params=urlencode(params), headers=headers, timeout=10)
+        res = await http_client.get(base_url, params=urlencode(params), headers=headers, timeout=10)
         res.raise_for_status()
         results = res.json()
 
@@ -47,7 +47,7 @@ if __name__ == "__main__":
     # query = "where are the best cafes in sydney australia" -> doesn't work
     #query = "best cafes in sydney australia" --> doesn't work
     query = "cafes in sydney australia"
-    results = search_osm(query)
+    results = asyncio.run(search_osm(query))
     print(results)
 
 # BETTER SEARCH THEN APPLEMAPS
@@ -1,4 +1,5 @@
-import requests
+import asyncio
+from src import http_client
 from datetime import datetime
 from urllib.parse import urlencode, urljoin
 
@@ -9,11 +10,27 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; redditbot/1.0)"
 }
 
-def search_reddit(query, limit=10):
+async def _top_comments(permalink, limit):
+    """Bodies of the top-level comments of a post, via its .json endpoint."""
+    url = urljoin(REDDIT_BASE_URL, permalink.rstrip("/") + ".json")
+    try:
+        resp = await http_client.get(url, params={"limit": limit, "sort": "top", "depth": 1}, headers=HEADERS)
+        listings = resp.json()
+        children = listings[1]["data"]["children"]
+    except Exception as e:
+        print("❌ Reddit comments failed:", e)
+        return []
+
+    bodies = [c["data"].get("body", "") for c in children if c.get("kind") == "t1"]
+    return [body for body in bodies if body and body not in ("[deleted]", "[removed]")][:limit]
+
+async def search_reddit(query, limit=10, comment_posts=2, top_comments=5):
+    # comments are only fetched for posts that are returned
+    comment_posts = min(comment_posts, limit)
     encoded = urlencode({"q": query, "limit": limit})
     url = REDDIT_SEARCH_URL.format(query=encoded)
 
-    resp = requests.get(url, headers=HEADERS)
+    resp = await http_client.get(url, headers=HEADERS)
     if resp.status_code != 200:
         print("❌ Reddit search failed:", resp.status_code)
         return []
@@ -25,22 +42,26 @@ def search_reddit(query, limit=10):
     for post in posts:
         post_data = post["data"]
         url = urljoin(REDDIT_BASE_URL, post_data["permalink"])
-        # title = post_data.get("title", "Untitled")
-        # text = post_data.get("selftext", "")
-        # if len(text) > 500:
-        #     text = text[:500] + "..."
-        # created_utc = post_data.get("created_utc")
-        # published = datetime.utcfromtimestamp(created_utc).strftime('%Y-%m-%d') if created_utc else None
-
-        # results.append({
-        #     "title": title,
-        #     "url": url,
-        #     "snippet": text if text else "[No text content]",
-        #     "published": published,
-        #     "source": "Reddit"
-        # })
-
-        results.append(url)
+        title = post_data.get("title", "Untitled")
+        text = post_data.get("selftext", "")
+        created_utc = post_data.get("created_utc")
+        published = datetime.utcfromtimestamp(created_utc).strftime('%Y-%m-%d') if created_utc else None
+
+        results.append({
+            "title": title,
+            "url": url,
+            "content": f"{title} ({published})\n\n{text}" if text else "",
+        })
+
+    # the selftext is already in the search payload, comments cost one call
+    # per post so only fetch them for the posts the caller is likely to use
+    comments = await asyncio.gather(*(
+        _top_comments(post["data"]["permalink"], top_comments) for post in posts[:comment_posts]
+    ))
+    for result, bodies in zip(results, comments):
+        if bodies:
+            content = result["content"] or result["title"]
+            result["content"] = content + "\n\nTop comments:\n" + "\n\n".join(f"- {b}" for b in bodies)
 
     return results
 
@@ -48,11 +69,9 @@ if __name__ == "__main__":
     #results = search_reddit("anxiety coping tips")
     #results = search_reddit("how to deal with anxiety")
     #results = search_reddit("my blood sugar is so high how do I deal with this")
-    results = search_reddit("high blood sugar")
-    # for r in results:
-    #     print(f"{r['title']} ({r['published']})\n{r['url']}\n{r['snippet']}\n")
-    print(results)
+    results = asyncio.run(search_reddit("high blood sugar"))
+    for r in results:
+        print(f"{r['title']}\n{r['url']}\n{r['content'][:300]}\n")
 
     # entity search
-    # returns web pages
-    # use jina api to scrape
\ No newline at end of file
+    # returns selftext + top comments, jina only for link posts without discussion
\ No newline at end of file
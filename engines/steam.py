@@ -1,16 +1,17 @@
 """Steam (store) chatbot integration script."""
 
-import requests
+import asyncio
+from src import http_client
 from urllib.parse import urlencode
 
 
-def search_steam_store(query, cc="us", lang="en"):
+async def search_steam_store(query, cc="us", lang="en", limit=10):
     base_url = "https://store.steampowered.com"
     query_params = {"term": query, "cc": cc, "l": lang}
     url = f"{base_url}/api/storesearch/?{urlencode(query_params)}"
 
     try:
-        resp = requests.get(url, timeout=10)
+        resp = await http_client.get(url, timeout=10)
         resp.raise_for_status()
         data = resp.json()
     except Exception as e:
@@ -18,7 +19,8 @@ def search_steam_store(query, cc="us", lang="en"):
         return []
 
     results = []
-    for item in data.get("items", []):
+    # storesearch has no page size parameter, cap the parsing instead
+    for item in data.get("items", [])[:limit]:
         app_id = item.get("id")
         title = item.get("name")
         url = f"{base_url}/app/{app_id}"
@@ -47,7 +49,7 @@ def search_steam_store(query, cc="us", lang="en"):
 if __name__ == "__main__":
     #query = "tell me about stardew valley"
     query = "stardew valley"
-    results = search_steam_store(query)
+    results = asyncio.run(search_steam_store(query))
     print(results)
     #for i, r in enumerate(results, 1):
     #    print(f"{i}. {r['title']}\n   {r['url']}\n   Price: {r['price']} | Platforms: {r['platforms']}\n")
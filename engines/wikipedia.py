@@ -1,6 +1,7 @@
 # engines/wikipedia.py
 
-import requests
+import asyncio
+from src import http_client
 from urllib.parse import quote
 
 WIKI_API = "https://en.wikipedia.org/api/rest_v1/page/summary/"
@@ -10,32 +11,42 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; wikibot/1.0)"
 }
 
-def search_wikipedia(query, limit=5):
+async def search_wikipedia(query, limit=5):
     search_url = f"https://en.wikipedia.org/w/api.php"
+    # generator=search + prop=extracts returns the matching pages with their
+    # plain-text intro in a single call, so nothing has to be scraped
     params = {
         "action": "query",
-        "list": "search",
-        "srsearch": query,
+        "generator": "search",
+        "gsrsearch": query,
+        "gsrlimit": limit,
+        "prop": "extracts",
+        "exintro": 1,
+        "explaintext": 1,
+        "exlimit": "max",
         "format": "json",
-        "srlimit": limit,
     }
 
     try:
-        resp = requests.get(search_url, params=params, headers=HEADERS)
-        results = resp.json().get("query", {}).get("search", [])
+        resp = await http_client.get(search_url, params=params, headers=HEADERS)
+        pages = resp.json().get("query", {}).get("pages", {})
     except Exception as e:
         print("❌ Wikipedia API error:", e)
         return []
 
+    # pages come back keyed by id, `index` is the search rank
     return [
-        f"https://en.wikipedia.org/wiki/{quote(result['title'].replace(' ', '_'))}"
-        for result in results
+        {
+            "title": page["title"],
+            "url": f"{BASE_URL}{quote(page['title'].replace(' ', '_'))}",
+            "content": f"{page['title']}\n\n{page['extract']}" if page.get("extract") else "",
+        }
+        for page in sorted(pages.values(), key=lambda page: page.get("index", 0))
     ]
 
 if __name__ == "__main__":
-    results = search_wikipedia("what should i do if i have high blood sugar")
+    results = asyncio.run(search_wikipedia("what should i do if i have high blood sugar"))
     print(results)
     
     # this works with full queries
-    # gets web urls from the output
-    # use jina ai to extract content afterwards
+    # returns the intro extract of each page, jina only if it is missing
@@ -1,9 +1,21 @@
 from fastapi import Depends, FastAPI, Header, HTTPException, Security
+from fastapi.responses import StreamingResponse
 from fastapi.security.api_key import APIKeyHeader, APIKey
 from starlette.status import HTTP_401_UNAUTHORIZED
 from pydantic import BaseModel
+from typing import Optional
+from contextlib import asynccontextmanager
 from src.main import SearchBot
+from src import http_client
+from src.scrape_cache import scrape_cache
+from src.result_cache import result_cache
+from src.http_cache import validator_cache
+from src.singleflight import coalescing_stats
+from src.circuit_breaker import breakers
+from src.boilerplate import scrape_stats
+from src.hedging import hedging_stats
 from dotenv import load_dotenv
+import json
 import os
 
 load_dotenv()
@@ -12,12 +24,26 @@ load_dotenv()
 API_KEY = os.getenv("FASTAPI_KEY")
 API_KEY_NAME = "X-API-Key"
 
-app = FastAPI(title="SearchBot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # close the pooled upstream connections on shutdown
+    await http_client.aclose()
+    scrape_cache.close()
+
+app = FastAPI(title="SearchBot API", lifespan=lifespan)
 
 bot = SearchBot()
 
 class QueryRequest(BaseModel):
     query: str
+    # latency budget in seconds, falls back to SEARCH_BUDGET_SECONDS
+    budget: Optional[float] = None
+    # max tokens of context returned, falls back to CONTEXT_TOKEN_BUDGET (0 = no limit)
+    token_budget: Optional[int] = None
+    # tokens gathered before remaining scrapes are cancelled,
+    # falls back to CONTENT_BUDGET_FACTOR x token_budget (0 = no limit)
+    content_budget: Optional[int] = None
 
 api_key_scheme = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
@@ -34,11 +60,58 @@ def health_check():
     return {"status": "ok"}
 
 @app.post("/search")
-def search(request: QueryRequest,
-           api_key: APIKey = Depends(get_api_key)
-           ):
-    result = bot.main(request.query)
+async def search(request: QueryRequest,
+                 api_key: APIKey = Depends(get_api_key)
+                 ):
+    result = await bot.main(request.query, budget=request.budget, token_budget=request.token_budget,
+                            content_budget=request.content_budget)
     return result
 
+@app.post("/search/stream")
+async def search_stream(request: QueryRequest,
+                        api_key: APIKey = Depends(get_api_key)
+                        ):
+    # NDJSON: one event per line, flushed as soon as it is produced
+    async def ndjson():
+        async for event in bot.stream(request.query, budget=request.budget, token_budget=request.token_budget,
+                                      content_budget=request.content_budget):
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/admin/http")
+def http_pool_stats(api_key: APIKey = Depends(get_api_key)):
+    return http_client.pool_stats()
+
+@app.get("/admin/cache")
+def cache_stats(api_key: APIKey = Depends(get_api_key)):
+    return {
+        "scrape": scrape_cache.stats(),
+        "engines": result_cache.stats(),
+        "http_validators": validator_cache.stats(),
+        "coalescing": coalescing_stats()
+    }
+
+@app.get("/admin/scrape")
+def scrape_reduction(api_key: APIKey = Depends(get_api_key)):
+    # bytes read from r.jina.ai vs bytes kept after clean-up, per domain
+    return scrape_stats()
+
+@app.get("/admin/hedging")
+def scrape_hedging(api_key: APIKey = Depends(get_api_key)):
+    # per-domain scrape latency histograms and how often hedges won
+    return hedging_stats()
+
+@app.get("/admin/scheduler")
+def scheduler_stats(api_key: APIKey = Depends(get_api_key)):
+    return {
+        "scheduler": http_client.scheduler.stats(),
+        "rate_limits": http_client.limiter_stats()
+    }
+
+@app.get("/admin/engines")
+def engine_breakers(api_key: APIKey = Depends(get_api_key)):
+    return {engine: breaker.stats() for engine, breaker in breakers.items()}
+
 # RUN: uvicorn src.api_server:app --host 0.0.0.0 --port 8000
 # swagger UI at http://localhost:8000/docs
\ No newline at end of file
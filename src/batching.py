@@ -0,0 +1,42 @@
+"""
+Helpers for engines that answer several inputs in one upstream request.
+
+The combined request (e.g. an arXiv `OR` query) returns one mixed result
+list; `split_by_query` hands each result back to the inputs it mentions.
+"""
+from src.result_cache import normalize_query
+
+# the combined query is split back per input, so ask upstream for some spare results
+BATCH_OVERFETCH = 2
+
+
+def _forms(word) -> set:
+    """The word and its possible singulars: "galaxies" -> galaxy, "boxes" -> box, "holes" -> hole."""
+    forms = {word}
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        forms.add(word[:-1])
+        if word.endswith("es"):
+            forms.add(word[:-2])
+        if word.endswith("ies"):
+            forms.add(word[:-3] + "y")
+    return forms
+
+
+def mentions(query, text) -> bool:
+    """True if every word of `query` appears in `text`, singular or plural (upstream search stems)."""
+    words = set().union(*(_forms(w) for w in normalize_query(text).split()))
+    return all(_forms(word) & words for word in normalize_query(query).split())
+
+
+def split_by_query(queries, results, text_of, limit):
+    """
+    Map each query to at most `limit` of the results that mention it, in
+    upstream rank order. A result that mentions several queries goes to each.
+    """
+    by_query = {query: [] for query in queries}
+    for result in results:
+        text = text_of(result)
+        for query in queries:
+            if len(by_query[query]) < limit and mentions(query, text):
+                by_query[query].append(result)
+    return by_query
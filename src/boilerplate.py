@@ -0,0 +1,131 @@
+"""
+Boilerplate stripping for pages scraped through r.jina.ai.
+
+Every domain gets an extraction profile from src/scrape_profiles.yaml:
+CSS selectors that r.jina.ai applies before converting the page, a byte
+cap enforced while the response is read, and line heuristics that drop
+what the selectors miss (menus, cookie banners, link farms, footers).
+Bytes in vs out are counted per domain.
+"""
+import os
+import re
+
+import yaml
+
+from src.urls import match_domain, url_host
+
+PROFILES_PATH = os.path.join(os.path.dirname(__file__), "scrape_profiles.yaml")
+
+with open(PROFILES_PATH, "r") as f:
+    PROFILES_CONFIG = yaml.safe_load(f)
+
+# these extend the default list instead of replacing it
+_LIST_KEYS = ("drop_lines", "stop_at")
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LIST_ITEM = re.compile(r"^\s*(?:[*+-]|\d+\.)\s+(.*)$")
+_HEADING = re.compile(r"^#{1,6}\s")
+_BLANK_RUN = re.compile(r"\n{3,}")
+# a list item this short with no sentence punctuation reads like a menu entry
+SHORT_ITEM_WORDS = 6
+
+# domain -> {"documents", "bytes_in", "bytes_out", "truncated"}
+_stats = {}
+
+
+def _compile(overrides: dict) -> dict:
+    default = PROFILES_CONFIG["default"]
+    profile = dict(default)
+    profile.update({k: v for k, v in overrides.items() if k not in _LIST_KEYS})
+    for key in _LIST_KEYS:
+        patterns = (default.get(key) or []) + (overrides.get(key) or [])
+        profile[key] = [re.compile(p) for p in patterns]
+    return profile
+
+
+DEFAULT_PROFILE = _compile({})
+PROFILES = {
+    domain: _compile(overrides or {})
+    for domain, overrides in PROFILES_CONFIG.items()
+    if domain != "default"
+}
+
+
+def profile_for(url: str) -> dict:
+    return match_domain(url, PROFILES, DEFAULT_PROFILE)
+
+
+def jina_headers(profile: dict) -> dict:
+    """Headers that make r.jina.ai cut the page down before converting it."""
+    headers = {}
+    if profile.get("target_selector"):
+        headers["X-Target-Selector"] = profile["target_selector"]
+    if profile.get("remove_selector"):
+        headers["X-Remove-Selector"] = profile["remove_selector"]
+    return headers
+
+
+def _is_short_item(line: str) -> bool:
+    match = _LIST_ITEM.match(line)
+    if not match:
+        return False
+    text = match.group(1).strip()
+    return len(text.split()) <= SHORT_ITEM_WORDS and not text.endswith((".", "?", "!", ":"))
+
+
+def clean(text: str, profile: dict) -> str:
+    """Single pass over the markdown lines, dropping boilerplate."""
+    kept = []
+    # consecutive short list items, kept only if the run is short
+    run = []
+    max_run = profile.get("max_link_run")
+    # menus sit above the first heading; lists below it (cast, ingredients) are content
+    before_heading = True
+
+    def flush():
+        if len(run) < max_run:
+            kept.extend(run)
+        run.clear()
+
+    for line in text.splitlines():
+        if any(p.search(line) for p in profile["stop_at"]):
+            break
+        stripped = _IMAGE.sub("", line)
+        if stripped != line and not stripped.strip():
+            # the line was only images
+            continue
+        line = stripped
+        if any(p.search(line) for p in profile["drop_lines"]):
+            continue
+        if _HEADING.match(line):
+            before_heading = False
+        if max_run and before_heading and _is_short_item(line):
+            run.append(line)
+            continue
+        if run and not line.strip():
+            # blank lines don't break a run of menu items
+            continue
+        if run:
+            flush()
+        kept.append(line)
+    if run:
+        flush()
+
+    return _BLANK_RUN.sub("\n\n", "\n".join(kept)).strip()
+
+
+def record(url: str, bytes_in: int, bytes_out: int, truncated: bool = False):
+    stats = _stats.setdefault(url_host(url), {"documents": 0, "bytes_in": 0, "bytes_out": 0, "truncated": 0})
+    stats["documents"] += 1
+    stats["bytes_in"] += bytes_in
+    stats["bytes_out"] += bytes_out
+    stats["truncated"] += int(truncated)
+
+
+def scrape_stats() -> dict:
+    report = {}
+    for domain, stats in _stats.items():
+        stats = dict(stats)
+        stats["reduction"] = 1 - stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else 0.0
+        report[domain] = stats
+    return report
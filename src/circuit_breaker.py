@@ -0,0 +1,200 @@
+"""
+Per-engine circuit breakers.
+
+Each engine has a rolling window of recent calls (outcome + latency). When
+its failure rate crosses the threshold the breaker opens and calls fail
+fast with CircuitOpenError; after a cooldown one probe call is let through
+(half-open) and its outcome closes or re-opens the breaker.
+
+Engines swallow their own errors and return an empty result, so
+src/http_client reports failed upstream responses (rate limits, server
+errors, blocks, transport errors) into the guarded call. An empty result
+is only a failure if one of those happened; no match is a valid answer.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from collections import deque
+
+from src.rate_limiter import BACKOFF_STATUSES
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "300"))
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+FAILURE_THRESHOLD = float(os.getenv("BREAKER_FAILURE_THRESHOLD", "0.5"))
+OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "60"))
+# calls slower than this drag an engine's health weight down
+SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "8"))
+
+
+# upstream statuses that count against an engine (403: blocked)
+FAILURE_STATUSES = BACKOFF_STATUSES | {403}
+
+# failed upstream responses seen during the current guarded call
+upstream_failures = contextvars.ContextVar("upstream_failures", default=None)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=WINDOW_SECONDS, min_calls=MIN_CALLS,
+                 failure_threshold=FAILURE_THRESHOLD, open_seconds=OPEN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        # (finished_at, ok, seconds)
+        self.calls = deque()
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _trim(self, now):
+        while self.calls and self.calls[0][0] < now - self.window:
+            self.calls.popleft()
+
+    def _current_state(self, now):
+        if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self.probing = False
+        return self.state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (open, cooldown not over)."""
+        return self._current_state(time.monotonic()) == OPEN
+
+    def allow(self) -> bool:
+        state = self._current_state(time.monotonic())
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def release(self):
+        """Give back a half-open probe slot without recording an outcome."""
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def record(self, ok, seconds):
+        now = time.monotonic()
+        self.counters["calls"] += 1
+        if not ok:
+            self.counters["failures"] += 1
+
+        if self.state == HALF_OPEN:
+            # the probe decides
+            self.probing = False
+            if ok:
+                self.state = CLOSED
+                self.calls.clear()
+            else:
+                self._open(now)
+            return
+
+        self.calls.append((now, ok, seconds))
+        self._trim(now)
+        if self.state == CLOSED and len(self.calls) >= self.min_calls and self.failure_rate() >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.counters["opened"] += 1
+
+    def failure_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok, _ in self.calls if not ok) / len(self.calls)
+
+    def avg_latency(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(seconds for _, _, seconds in self.calls) / len(self.calls)
+
+    def health(self) -> float:
+        """Routing weight in [0, 1]: 0 when open, lower for failing or slow engines."""
+        state = self._current_state(time.monotonic())
+        if state == OPEN:
+            return 0.0
+        self._trim(time.monotonic())
+        if len(self.calls) < self.min_calls:
+            return 1.0 if state == CLOSED else 0.5
+        weight = 1.0 - self.failure_rate()
+        latency = self.avg_latency()
+        if latency > SLOW_CALL_SECONDS:
+            weight *= SLOW_CALL_SECONDS / latency
+        return weight
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        stats["state"] = self._current_state(time.monotonic())
+        stats["window_calls"] = len(self.calls)
+        stats["failure_rate"] = self.failure_rate()
+        stats["avg_latency"] = self.avg_latency()
+        stats["health"] = self.health()
+        return stats
+
+
+breakers = {}
+
+
+def get_breaker(engine) -> CircuitBreaker:
+    if engine not in breakers:
+        breakers[engine] = CircuitBreaker(engine)
+    return breakers[engine]
+
+
+def engine_health() -> dict:
+    """{engine: health weight} for every engine that has been called."""
+    return {engine: breaker.health() for engine, breaker in breakers.items()}
+
+
+def is_open(engine) -> bool:
+    return engine in breakers and breakers[engine].is_open()
+
+
+def report_failure(reason):
+    """Called by src/http_client for a failed upstream call, credited to the engine calling it."""
+    failures = upstream_failures.get()
+    if failures is not None:
+        failures.append(reason)
+
+
+def guarded(engine, search_func):
+    """Wrap an engine call so it goes through (and feeds) the engine's breaker."""
+    breaker = get_breaker(engine)
+
+    @functools.wraps(search_func)
+    async def wrapper(*args, **kwargs):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{engine} circuit is open")
+        t0 = time.perf_counter()
+        failures = []
+        token = upstream_failures.set(failures)
+        try:
+            result = await search_func(*args, **kwargs)
+        except asyncio.CancelledError:
+            # cut off by the request deadline, says nothing about the engine
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(False, time.perf_counter() - t0)
+            raise
+        finally:
+            upstream_failures.reset(token)
+        # batch entry points (and huggingface) return a dict of result lists
+        found = any(result.values()) if isinstance(result, dict) else bool(result)
+        # empty with clean upstream responses is a legitimate "no match"
+        breaker.record(found or not failures, time.perf_counter() - t0)
+        return result
+    return wrapper
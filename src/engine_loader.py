@@ -2,7 +2,7 @@ from engines.google import get_google_urls
 from engines.reddit import search_reddit
 from engines.wikipedia import search_wikipedia
 from engines.goodreads import search_goodreads
-from engines.arxiv import search_arxiv
+from engines.arxiv import search_arxiv, search_arxiv_many
 from engines.steam import search_steam_store
 from engines.imdb import search_imdb
 from engines.deviantart import search_deviantart
@@ -10,11 +10,13 @@ from engines.github import search_github_repos
 from engines.hackernews import search_hackernews
 from engines.huggingface import search_huggingface
 from engines.openstreetmap import search_osm
-from engines.astrophysics_data_system import search_ads
+from engines.astrophysics_data_system import search_ads, search_ads_many
 from engines.jina_search import jina_search
+from src.result_cache import cached_engine, cached_batch_engine
+from src.circuit_breaker import guarded
 
 # Map engine names to their search functions
-SEARCH_ENGINES = {
+ENGINE_FUNCTIONS = {
     "jina_search": jina_search,
     "google": get_google_urls,
     "reddit": search_reddit,
@@ -29,4 +31,19 @@ SEARCH_ENGINES = {
     "huggingface": search_huggingface,
     "openstreetmap": search_osm,
     "astrophysics_data_system": search_ads
-}
\ No newline at end of file
+}
+
+# What the pipeline calls: the same functions behind the result cache, with
+# a circuit breaker around the upstream call (cache hits never reach it)
+SEARCH_ENGINES = {
+    engine: cached_engine(engine, guarded(engine, search_func))
+    for engine, search_func in ENGINE_FUNCTIONS.items()
+}
+
+# Engines that can answer several inputs in one upstream request,
+# taking a list of inputs and returning {input: results}
+BATCH_ENGINES = {
+    "arxiv": cached_batch_engine("arxiv", guarded("arxiv", search_arxiv_many)),
+    "astrophysics_data_system": cached_batch_engine(
+        "astrophysics_data_system", guarded("astrophysics_data_system", search_ads_many)),
+}
@@ -22,8 +22,13 @@ def validate_tags(tags, allowed_tags):
 with open("src/engine_config.yaml", "r") as f:
     ENGINE_TAGS_WEIGHTED = yaml.safe_load(f)
 
-def rank_engines(tags: list[str], top_n=2, min_score_threshold=0.6, debug=False):
-    """Rank search engines based on their relevance to the given tags."""
+def rank_engines(tags: list[str], top_n=2, min_score_threshold=0.6, debug=False, health=None):
+    """
+    Rank search engines based on their relevance to the given tags.
+    `health` ({engine: weight in [0, 1]}) scales each score, so failing or
+    slow engines drop below the threshold.
+    """
+    health = health or {}
     engine_scores = {}
 
     def dprint(*args, **kwargs):
@@ -54,8 +59,8 @@ def rank_engines(tags: list[str], top_n=2, min_score_threshold=0.6, debug=False)
                 dprint(f"   ✗ No weight for tag: {tag}")
 
         if relevant_tags > 0:
-            average_score = total_score / relevant_tags
-            dprint(f"   📊 Final score: {average_score:.2f} (total: {total_score} / matches: {relevant_tags})")
+            average_score = total_score / relevant_tags * health.get(engine, 1.0)
+            dprint(f"   📊 Final score: {average_score:.2f} (total: {total_score} / matches: {relevant_tags}, health: {health.get(engine, 1.0):.2f})")
 
             if average_score >= min_score_threshold:
                 engine_scores[engine] = average_score
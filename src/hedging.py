@@ -0,0 +1,129 @@
+"""
+Hedged and oversubscribed scrapes for tail latency.
+
+Scrape latency is recorded per domain in a bucketed histogram. With
+hedging on, a scrape still running past its domain's p90 gets a duplicate
+request; whichever answers first is used and the other is cancelled.
+Domains without enough samples yet are never hedged. Oversubscription
+(SCRAPE_OVERSUBSCRIBE in src/main.py) is counted here too.
+"""
+import asyncio
+import bisect
+import os
+
+from src.urls import url_host
+
+HEDGING = os.getenv("SCRAPE_HEDGING", "0") == "1"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.9"))
+# samples a domain needs before its quantile is trusted
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# bucket upper bounds in seconds, 50ms growing by 1.5x up to ~2 minutes
+BUCKETS = [0.05 * 1.5 ** i for i in range(20)]
+
+counters = {
+    "hedged": 0,
+    "hedge_won": 0,
+    "primary_won": 0,
+    # spare links scraped beyond what was kept, and spares cancelled unfinished
+    "spare_scrapes": 0,
+    "spares_cancelled": 0,
+}
+
+
+class LatencyHistogram:
+    def __init__(self):
+        # the last bucket catches everything slower than BUCKETS[-1]
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, None without samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+# domain -> LatencyHistogram
+histograms = {}
+
+
+def observe(url, seconds):
+    histograms.setdefault(url_host(url), LatencyHistogram()).observe(seconds)
+
+
+def hedge_delay(url):
+    """Seconds to wait before hedging a scrape of `url`, None if it should not be hedged."""
+    histogram = histograms.get(url_host(url))
+    if histogram is None or histogram.count < HEDGE_MIN_SAMPLES:
+        return None
+    return histogram.quantile(HEDGE_QUANTILE)
+
+
+async def hedged(url, fetch):
+    """
+    Await `fetch()`, launching a second `fetch()` if the first outlives the
+    domain's hedge delay. The first one to succeed wins.
+    """
+    delay = hedge_delay(url) if HEDGING else None
+    if delay is None:
+        return await fetch()
+
+    primary = asyncio.create_task(fetch())
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        counters["hedged"] += 1
+        hedge = asyncio.create_task(fetch())
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                winner = succeeded[0]
+                counters["hedge_won" if winner is hedge else "primary_won"] += 1
+                return winner.result()
+        # both attempts failed
+        return primary.result()
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+def record_oversubscription(spares, cancelled):
+    counters["spare_scrapes"] += spares
+    counters["spares_cancelled"] += cancelled
+
+
+def hedging_stats():
+    total = counters["hedged"]
+    return {
+        "enabled": HEDGING,
+        **counters,
+        "hedge_win_rate": counters["hedge_won"] / total if total else 0.0,
+        "domains": {domain: histogram.stats() for domain, histogram in histograms.items()},
+    }
@@ -0,0 +1,72 @@
+"""
+Validator store for conditional GETs in src/http_client.py.
+
+Responses that carry an ETag or Last-Modified are remembered by URL. The
+next GET of that URL (typically when its result-cache entry has expired)
+sends If-None-Match / If-Modified-Since, and a 304 is answered from the
+stored body, so it only costs headers and, on GitHub, no rate-limit quota.
+"""
+import httpx
+from cachetools import LRUCache
+
+from src.scrape_cache import CACHE_CONFIG
+
+# describe the stored body as received, not as it was sent on the wire
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ValidatorCache:
+    def __init__(self, memory_bytes):
+        # entries are (validators, headers, body), sized by the body
+        self.entries = LRUCache(maxsize=memory_bytes, getsizeof=lambda entry: len(entry[2]) or 1)
+        self.counters = {"stored": 0, "revalidations": 0, "not_modified": 0, "bytes_saved": 0}
+
+    def conditional_headers(self, url: str) -> dict:
+        entry = self.entries.get(url)
+        if entry is None:
+            return {}
+        self.counters["revalidations"] += 1
+        return entry[0]
+
+    def store(self, url: str, response: httpx.Response):
+        validators = {}
+        if "etag" in response.headers:
+            validators["If-None-Match"] = response.headers["etag"]
+        if "last-modified" in response.headers:
+            validators["If-Modified-Since"] = response.headers["last-modified"]
+        if response.status_code != 200 or not validators:
+            return
+
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS]
+        try:
+            self.entries[url] = (validators, headers, response.content)
+            self.counters["stored"] += 1
+        except ValueError:
+            # larger than the whole cache
+            pass
+
+    def not_modified(self, url: str, response: httpx.Response) -> httpx.Response:
+        """Turn a 304 into the stored 200, refreshed with the 304's headers."""
+        validators, headers, body = self.entries[url]
+        merged = httpx.Headers(headers)
+        for key, value in response.headers.items():
+            if key.lower() not in _DROPPED_HEADERS:
+                merged[key] = value
+
+        self.counters["not_modified"] += 1
+        self.counters["bytes_saved"] += len(body)
+        fresh = httpx.Response(200, headers=merged, content=body, request=response.request)
+        self.store(url, fresh)
+        return fresh
+
+    def has(self, url: str) -> bool:
+        return url in self.entries
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        stats["entries"] = len(self.entries)
+        stats["bytes"] = self.entries.currsize
+        return stats
+
+
+validator_cache = ValidatorCache(CACHE_CONFIG["http"]["memory_bytes"])
@@ -0,0 +1,253 @@
+"""
+Shared HTTP client for every engine and the Jina scraper.
+
+One pooled httpx.AsyncClient per upstream host so connections (and TLS
+sessions) are kept alive between calls instead of paying a fresh
+handshake on every request. Pool sizes, HTTP/2, timeouts, rate limits
+and the scheduler's concurrency limit are per host in
+src/upstream_config.yaml.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import yaml
+
+from src.circuit_breaker import FAILURE_STATUSES, report_failure
+from src.http_cache import validator_cache
+from src.rate_limiter import UpstreamLimiter
+from src.request_context import current_request, remaining_budget
+from src.scheduler import Scheduler
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "upstream_config.yaml")
+
+with open(CONFIG_PATH, "r") as f:
+    UPSTREAMS = yaml.safe_load(f)
+
+# HTTP/2 needs the optional `h2` package, fall back to HTTP/1.1 without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Global cap on concurrent upstream calls across all requests
+MAX_WORKERS = int(os.getenv("SCHEDULER_MAX_WORKERS", "64"))
+
+_clients = {}
+_stats = {}
+_limiters = {}
+
+
+def host_config(host: str) -> dict:
+    config = dict(UPSTREAMS.get("default", {}))
+    config.update(UPSTREAMS.get(host) or {})
+    return config
+
+
+def _new_stats():
+    return {
+        "requests": 0,
+        "errors": 0,
+        "in_flight": 0,
+        "bytes_received": 0,
+        "not_modified": 0,
+        "total_time": 0.0,
+    }
+
+
+def client_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the pooled client for the host of `url`, creating it on first use."""
+    key = client_key(url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    host = urlsplit(url).hostname or ""
+    config = host_config(host)
+    http2 = bool(config["http2"]) and HTTP2_AVAILABLE
+    if config["http2"] and not HTTP2_AVAILABLE:
+        logging.info(f"h2 not installed, using HTTP/1.1 for {host}")
+
+    client = httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"],
+        ),
+        timeout=httpx.Timeout(
+            config["read_timeout"],
+            connect=config["connect_timeout"],
+        ),
+    )
+    _clients[key] = client
+    _stats[key] = _new_stats()
+    return client
+
+
+def get_limiter(host: str) -> UpstreamLimiter:
+    limiter = _limiters.get(host)
+    if limiter is None:
+        config = host_config(host)
+        limiter = _limiters[host] = UpstreamLimiter(
+            rate=config.get("rate"),
+            burst=config.get("burst", 1),
+            max_concurrency=config["max_concurrency"],
+        )
+    return limiter
+
+
+# per-host caps follow each limiter's adaptive (AIMD) concurrency
+scheduler = Scheduler(MAX_WORKERS, host_limit=lambda host: get_limiter(host).limit())
+
+
+async def _wait_for_rate_limit(limiter):
+    wait = limiter.reserve(remaining_budget())
+    if wait <= 0:
+        return
+    ctx = current_request.get()
+    if ctx is not None:
+        ctx.wait_time["rate_limit"] += wait
+    try:
+        await asyncio.sleep(wait)
+    except asyncio.CancelledError:
+        limiter.cancel()
+        raise
+
+
+def _clamp_timeout(timeout, remaining):
+    """Shrink every phase of `timeout` so it cannot outlive the request budget."""
+    if not isinstance(timeout, httpx.Timeout):
+        timeout = httpx.Timeout(timeout)
+
+    def clamp(value):
+        return remaining if value is None else min(value, remaining)
+
+    return httpx.Timeout(
+        connect=clamp(timeout.connect),
+        read=clamp(timeout.read),
+        write=clamp(timeout.write),
+        pool=clamp(timeout.pool),
+    )
+
+
+async def _read_capped(response: httpx.Response, max_bytes: int) -> httpx.Response:
+    """Read at most `max_bytes` of a streamed body and close the connection early."""
+    body = bytearray()
+    truncated = False
+    try:
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > max_bytes:
+                truncated = True
+                del body[max_bytes:]
+                break
+    finally:
+        await response.aclose()
+
+    # the body is already decoded, so the wire encoding headers no longer apply
+    headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length")]
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        content=bytes(body),
+        request=response.request,
+        extensions={**response.extensions, "truncated": truncated},
+    )
+
+
+async def request(method: str, url: str, max_bytes: int = None, **kwargs) -> httpx.Response:
+    """
+    Send through the host's pooled client. With `max_bytes` the body is
+    streamed and cut at that size (response.extensions["truncated"]).
+    """
+    client = get_client(url)
+    host = urlsplit(url).hostname or ""
+    limiter = get_limiter(host)
+
+    # token first, so requests waiting on a rate limit don't hold a slot
+    await _wait_for_rate_limit(limiter)
+    async with scheduler.slot(host):
+        # checked after the slot is granted, queueing eats into the budget too
+        remaining = remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                raise httpx.TimeoutException("Request budget exhausted")
+            kwargs["timeout"] = _clamp_timeout(kwargs.get("timeout", client.timeout), remaining)
+
+        stats = _stats[client_key(url)]
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        t0 = time.perf_counter()
+        outgoing = client.build_request(method, url, **kwargs)
+        key = str(outgoing.url)
+        if method == "GET":
+            # revalidate instead of refetching if we hold a validator for it
+            outgoing.headers.update(validator_cache.conditional_headers(key))
+        try:
+            response = await client.send(outgoing, stream=max_bytes is not None)
+            if max_bytes is not None:
+                response = await _read_capped(response, max_bytes)
+        except Exception as e:
+            stats["errors"] += 1
+            if isinstance(e, httpx.TransportError):
+                limiter.backoff()
+                report_failure(type(e).__name__)
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            stats["total_time"] += time.perf_counter() - t0
+        limiter.on_response(response.status_code, response.headers)
+
+    stats["bytes_received"] += len(response.content)
+    if response.status_code >= 400:
+        stats["errors"] += 1
+    if response.status_code in FAILURE_STATUSES:
+        report_failure(response.status_code)
+
+    if method == "GET":
+        if response.status_code == 304 and validator_cache.has(key):
+            stats["not_modified"] += 1
+            return validator_cache.not_modified(key, response)
+        if not response.extensions.get("truncated"):
+            validator_cache.store(key, response)
+    return response
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+def pool_stats() -> dict:
+    """Request counters plus live connection counts for every host pool."""
+    report = {}
+    for key, client in _clients.items():
+        stats = dict(_stats[key])
+        stats["avg_time"] = stats["total_time"] / stats["requests"] if stats["requests"] else 0.0
+
+        # httpx keeps the httpcore pool private, so read it defensively
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        stats["http2"] = any("HTTP/2" in c.info() for c in connections)
+        report[key] = stats
+    return report
+
+
+def limiter_stats() -> dict:
+    return {host: limiter.stats() for host, limiter in _limiters.items()}
+
+
+async def aclose():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+    _stats.clear()
@@ -1,4 +1,12 @@
-import requests
+import asyncio
+import time
+from src import http_client
+from src.boilerplate import clean, jina_headers, profile_for, record
+from src.hedging import hedged, observe
+from src.scrape_cache import scrape_cache
+from src.singleflight import SingleFlight
+from src.tokens import calibrate, estimate_tokens
+from src.urls import document_key
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
@@ -11,17 +19,48 @@ model = genai.GenerativeModel("gemini-2.0-flash")
 api_key = os.getenv("JINA_API_KEY")
 headers = {
     "Authorization": api_key, # has bearer prefix
-    "X-Md-Link-Style": "discarded"
+    "X-Md-Link-Style": "discarded",
+    # image alt text is noise for the LLM
+    "X-Retain-Images": "none"
 }
 
-def jina(url:str):
+# concurrent scrapes of the same page share one r.jina.ai call
+inflight_scrapes = SingleFlight("scrapes")
+
+class ScrapeError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error: {status_code}")
+
+async def jina(url:str):
+    cached = await scrape_cache.get(url)
+    if cached is not None:
+        return cached
+    try:
+        # a scrape slower than its domain's p90 gets a duplicate request (SCRAPE_HEDGING=1)
+        return await inflight_scrapes.do(document_key(url), lambda: hedged(url, lambda: _scrape(url)))
+    except ScrapeError as e:
+        # raised inside so a failed attempt never beats a good one, callers get the text
+        return str(e)
+
+async def _scrape(url:str):
     endpoint = f"https://r.jina.ai/{url}"
-    response = requests.get(endpoint, headers=headers)
+    profile = profile_for(url)
+    t0 = time.perf_counter()
+    response = await http_client.get(
+        endpoint,
+        headers={**headers, **jina_headers(profile)},
+        max_bytes=profile["max_bytes"],
+    )
     if response.status_code == 200:
-        content = response.text
+        # error pages return fast and would drag the domain's quantiles down
+        observe(url, time.perf_counter() - t0)
+        content = clean(response.text, profile)
+        record(url, len(response.content), len(content.encode()), response.extensions.get("truncated", False))
+        # only successful pages are cached, errors are retried next time
+        await scrape_cache.set(url, content)
         return content
     else:
-        return f"Error: {response.status_code}"
+        raise ScrapeError(response.status_code)
 
 if __name__ == "__main__":
     #url = "https://www.climate.gov/news-features/understanding-climate/climate-change-atmospheric-carbon-dioxide"
@@ -30,8 +69,10 @@ if __name__ == "__main__":
     #url = "http://arxiv.org/pdf/2001.09608v1.pdf"
     url = "https://www.goodreads.com/book/show/35487222-barkus?from_search=true&from_srp=true&qid=eN3qNuTEkh&rank=1"
     #url = "https://www.imdb.com/title/tt15398776"
-    res = jina(url)
+    res = asyncio.run(jina(url))
     print(res)
     #print(type(res))
     token_info = model.count_tokens(res)
     print("🔢 Token count:", token_info.total_tokens)
+    # TOKEN_SCALE that would make the local estimate match this page
+    print("📏 Local estimate:", estimate_tokens(res), "scale:", calibrate([(res, token_info.total_tokens)]))
@@ -8,6 +8,7 @@ import os
 from openai import OpenAI
 import re
 import json
+import time
 import spacy
 from dotenv import load_dotenv
 
@@ -84,6 +85,64 @@ def identify_entities(prompt: str) -> list:
 # for prompt in prompts:
 #     print(identify_entities(prompt))
 
+def local_entities(prompt: str) -> list:
+    # spaCy named entities, or its noun phrases when it finds none
+    return identify_entities(prompt) or identify_noun_phrases(prompt)
+
+def identify_noun_phrases(prompt: str) -> list:
+    # SpaCy noun chunks without determiners/pronouns ("a black hole" -> "black hole")
+    doc = nlp(prompt)
+    phrases = []
+    for chunk in doc.noun_chunks:
+        phrase = " ".join(t.text for t in chunk if t.pos_ not in {"DET", "PRON"}).strip()
+        if phrase and phrase not in phrases:
+            phrases.append(phrase)
+    return phrases
+
+# Keyword hints for the local tag classifier used by the fast path
+TAG_KEYWORDS = {
+    "books": ["book", "novel", "author", "reading"],
+    "movies": ["movie", "film", "actor", "actress", "director", "cinema"],
+    "games": ["game", "gaming", "steam", "playstation", "xbox", "nintendo"],
+    "code": ["code", "python", "javascript", "library", "repo", "github", "api", "programming"],
+    "ai": ["ai", "llm", "llms", "gpt", "neural", "langchain", "transformer", "machine learning"],
+    "aimodels": ["model", "models", "huggingface", "checkpoint"],
+    "datasets": ["dataset", "datasets"],
+    "papers": ["paper", "papers", "arxiv", "study", "studies"],
+    "research": ["research", "theory", "physics"],
+    "science": ["science", "physics", "chemistry", "biology", "photosynthesis", "black hole", "quantum", "planet", "galaxy"],
+    "location": ["where", "near", "city", "country", "cafe", "cafes", "restaurant", "restaurants"],
+    "travel": ["travel", "trip", "visit", "holiday", "vacation"],
+    "food": ["food", "recipe", "cook", "cooking", "dish", "cuisine"],
+    "history": ["history", "war", "ancient", "empire", "century"],
+    "news": ["news", "latest", "today"],
+    "medicine": ["symptom", "symptoms", "disease", "doctor", "blood", "treatment"],
+    "mental health": ["anxiety", "depression", "stress", "grief"],
+    "relationships": ["boyfriend", "girlfriend", "partner", "dating", "marriage"],
+    "pets": ["cat", "cats", "dog", "dogs", "pet", "pets"],
+    "celebrity": ["singer", "celebrity", "famous"],
+    "finance": ["stock", "stocks", "invest", "crypto", "price"],
+    "economics": ["economy", "inflation", "economics"],
+    "climate": ["climate", "carbon", "emissions"],
+}
+
+def classify_tags_local(prompt: str) -> list:
+    """Keyword-based stand-in for classify_tags that needs no LLM call."""
+    words = re.sub(r"[^a-z0-9 ]", " ", prompt.lower()).split()
+    # naive singulars so "movies" matches "movie"
+    words += [w[:-1] for w in words if w.endswith("s") and len(w) > 3]
+    text = f" {' '.join(words)} "
+    scores = {}
+    for tag, keywords in TAG_KEYWORDS.items():
+        hits = sum(1 for kw in keywords if f" {kw} " in text)
+        if hits:
+            scores[tag] = hits
+    # nothing specific: a definition-style question, so lean on the encyclopedia
+    if not scores:
+        return ["encyclopedia"]
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return ranked[:5]
+
 def classify_tags(prompt: str) -> list:
     try:
         response = client.chat.completions.create(
@@ -138,47 +197,129 @@ def analyze_prompt_complexity(prompt: str) -> dict:
     complexity_metrics['complexity_score'] = round(score, 2)
     return complexity_metrics
 
-def decompose_prompt(prompt):
-    try:
+# Which query analysis runs: "single" (one structured-output call) or
+# "two_call" (classify_tags then decompose_prompt, the original path)
+QUERY_ANALYSIS_MODE = os.getenv("QUERY_ANALYSIS_MODE", "single")
+
+# Queries scoring below this in analyze_prompt_complexity skip the LLM
+# entirely (0 disables the fast path)
+FAST_PATH_THRESHOLD = float(os.getenv("FAST_PATH_THRESHOLD", "30"))
+
+# JSON schema enforced on the single-call analysis response
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tags": {
+            "type": "array",
+            "items": {"type": "string", "enum": TAGS},
+        },
+        "entities": {
+            "type": "array",
+            "items": {"type": "string"},
+        },
+        "sub_queries": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "sub_query": {"type": "string"},
+                    "intent": {"type": "string"},
+                    "entities": {"type": "array", "items": {"type": "string"}},
+                    "engine": {"type": "string"},
+                },
+                "required": ["sub_query", "intent", "entities", "engine"],
+            },
+        },
+    },
+    "required": ["tags", "entities", "sub_queries"],
+}
+
+def _decomposition_template(prompt, complexity):
+    """Prompt template plus generation settings, scaled to the query's complexity."""
+    template = {
+        "instructions": "Decompose the user query into multiple sub-queries if necessary. Each sub-query must include an 'engine' field set to 'all'.",
+        "examples": [
+            {
+                "user_prompt": "Analyze the impact of climate change on agriculture, including water availability, crop yield, and pest patterns.",
+                "tags": ["climate", "agriculture", "environment"],
+                "sub_queries": [
+                    {"sub_query": "What is the impact of climate change on water availability in agriculture?", "intent": "Understand", "entities": ["climate change", "water availability", "agriculture"], "engine": "all"},
+                    {"sub_query": "How does climate change affect crop yield in agriculture?", "intent": "Assess", "entities": ["climate change", "crop yield", "agriculture"], "engine": "all"},
+                    {"sub_query": "What are the effects of climate change on pest patterns in agriculture?", "intent": "Evaluate", "entities": ["climate change", "pest patterns", "agriculture"], "engine": "all"}
+                ]
+            }
+        ]
+    }
+
+    if complexity['complexity_score'] > 70:
+        template["instructions"] += " Break down into focused sub-queries."
+        max_tokens = 4096
+        temperature = 0.2
+    elif complexity['complexity_score'] > 40:
+        template["instructions"] += " Maintain moderate granularity."
+        max_tokens = 3072
+        temperature = 0.3
+    else:
+        template["instructions"] += " Keep it simple and direct."
+        max_tokens = 2048
+        temperature = 0.4
+
+    template["query"] = prompt
+    template["entities"] = complexity["identified_entities"]
+    template["query_complexity"] = {
+        "score": complexity['complexity_score'],
+        "has_code_blocks": complexity['has_code_blocks'],
+        "has_special_instructions": complexity['has_special_instructions']
+    }
+    return template, max_tokens, temperature
+
+def _finish_analysis(parsed_response, complexity, tags, entities, usage, mode, timings):
+    parsed_response["tags"] = tags
+    parsed_response["entities"] = entities
+    parsed_response["complexity_analysis"] = {
+        "complexity_score": complexity['complexity_score'],
+        "metrics": {
+            "character_count": complexity['character_count'],
+            "word_count": complexity['word_count'],
+            "sentence_count": complexity['sentence_count'],
+            "average_word_length": complexity['average_word_length'],
+            "has_code_blocks": 'True' if bool(complexity['has_code_blocks']) else 'False',
+            "has_special_instructions": 'True' if bool(complexity['has_special_instructions']) else 'False'
+        }
+    }
+
+    parsed_response["token_usage"] = {
+        "total_tokens": usage.total_tokens if usage else 0,
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "completion_tokens": usage.completion_tokens if usage else 0
+    }
+    # which path produced this and where its time went, in seconds
+    parsed_response["analysis"] = {"mode": mode, "timings": timings}
+
+    return json.dumps(parsed_response, indent=4, cls=CustomJSONEncoder)
+
+def _complexity_with_timing(prompt, complexity, timings):
+    # callers that already scored the prompt pass it in with its spaCy time
+    timings = dict(timings or {})
+    if complexity is None:
+        t0 = time.perf_counter()
         complexity = analyze_prompt_complexity(prompt)
+        timings["spacy"] = time.perf_counter() - t0
+    return complexity, timings
+
+def decompose_prompt(prompt, mode="two_call", complexity=None, timings=None):
+    """Two-call analysis: classify_tags, then a decomposition call with the tags pasted in."""
+    try:
+        complexity, timings = _complexity_with_timing(prompt, complexity, timings)
+
+        t0 = time.perf_counter()
         generated_tags = classify_tags(prompt)
-        template = {
-            "instructions": "Decompose the user query into multiple sub-queries if necessary. Each sub-query must include an 'engine' field set to 'all'.",
-            "examples": [
-                {
-                    "user_prompt": "Analyze the impact of climate change on agriculture, including water availability, crop yield, and pest patterns.",
-                    "tags": ["climate", "agriculture", "environment"],
-                    "sub_queries": [
-                        {"sub_query": "What is the impact of climate change on water availability in agriculture?", "intent": "Understand", "entities": ["climate change", "water availability", "agriculture"], "engine": "all"},
-                        {"sub_query": "How does climate change affect crop yield in agriculture?", "intent": "Assess", "entities": ["climate change", "crop yield", "agriculture"], "engine": "all"},
-                        {"sub_query": "What are the effects of climate change on pest patterns in agriculture?", "intent": "Evaluate", "entities": ["climate change", "pest patterns", "agriculture"], "engine": "all"}
-                    ]
-                }
-            ]
-        }
+        timings["classify_tags"] = time.perf_counter() - t0
 
-        if complexity['complexity_score'] > 70:
-            template["instructions"] += " Break down into focused sub-queries."
-            max_tokens = 4096
-            temperature = 0.2
-        elif complexity['complexity_score'] > 40:
-            template["instructions"] += " Maintain moderate granularity."
-            max_tokens = 3072
-            temperature = 0.3
-        else:
-            template["instructions"] += " Keep it simple and direct."
-            max_tokens = 2048
-            temperature = 0.4
-
-        template["query"] = prompt
+        template, max_tokens, temperature = _decomposition_template(prompt, complexity)
         template["tags"] = generated_tags
-        template["entities"] = complexity["identified_entities"]
-        template["query_complexity"] = {
-            "score": complexity['complexity_score'],
-            "has_code_blocks": complexity['has_code_blocks'],
-            "has_special_instructions": complexity['has_special_instructions']
-        }
 
+        t0 = time.perf_counter()
         response = client.chat.completions.create(
             model="gemini-2.0-flash",
             messages=[
@@ -189,6 +330,7 @@ def decompose_prompt(prompt):
             max_tokens=max_tokens,
             temperature=temperature
         )
+        timings["decompose"] = time.perf_counter() - t0
 
         decomposition = response.choices[0].message.content.strip()
         decomposition = strip_code_block(decomposition)
@@ -197,36 +339,88 @@ def decompose_prompt(prompt):
         if isinstance(parsed_response, list):
             parsed_response = {"sub_queries": parsed_response}
 
-        parsed_response["tags"] = generated_tags
-        parsed_response["entities"] = complexity["identified_entities"]
-        parsed_response["complexity_analysis"] = {
-            "complexity_score": complexity['complexity_score'],
-            "metrics": {
-                "character_count": complexity['character_count'],
-                "word_count": complexity['word_count'],
-                "sentence_count": complexity['sentence_count'],
-                "average_word_length": complexity['average_word_length'],
-                "has_code_blocks": 'True' if bool(complexity['has_code_blocks']) else 'False',
-                "has_special_instructions": 'True' if bool(complexity['has_special_instructions']) else 'False'
-            }
-        }
-
-        usage = response.usage
-        parsed_response["token_usage"] = {
-            "total_tokens": usage.total_tokens,
-            "prompt_tokens": usage.prompt_tokens,
-            "completion_tokens": usage.completion_tokens
-        }
-
-        return json.dumps(parsed_response, indent=4, cls=CustomJSONEncoder)
+        return _finish_analysis(parsed_response, complexity, generated_tags, complexity["identified_entities"],
+                                response.usage, mode, timings)
 
     except Exception as e:
         return json.dumps({"error": str(e), "success": False}, indent=4, cls=CustomJSONEncoder)
 
+def analyze_query_single(prompt, complexity=None, timings=None):
+    """
+    One structured-output call returning tags, entities and sub-queries
+    together. Raises on any failure so the caller can fall back.
+    """
+    complexity, timings = _complexity_with_timing(prompt, complexity, timings)
+
+    template, max_tokens, temperature = _decomposition_template(prompt, complexity)
+    template["instructions"] += (
+        f" Also choose 1 to 5 lowercase tags for the whole query from {TAGS}"
+        " and list its important entities (concepts, technical terms, proper nouns)."
+    )
+
+    t0 = time.perf_counter()
+    response = client.chat.completions.create(
+        model="gemini-2.0-flash",
+        messages=[
+            {"role": "system", "content": "You are an AI assistant that classifies user queries and processes them into structured sub-queries."},
+            {"role": "user", "content": json.dumps(template)}
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "query_analysis", "schema": ANALYSIS_SCHEMA, "strict": True}
+        },
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    timings["analyze"] = time.perf_counter() - t0
+
+    parsed_response = json.loads(response.choices[0].message.content)
+    tags = [t for t in parsed_response.get("tags", []) if t in TAGS][:5]
+    entities = parsed_response.get("entities") or complexity["identified_entities"]
+
+    return _finish_analysis(parsed_response, complexity, tags, entities,
+                            response.usage, "single", timings)
+
+def analyze_query_fast(prompt, complexity=None, timings=None):
+    """
+    Local analysis for simple queries: spaCy entities (or noun phrases when
+    it finds none) as entities, the query itself as the only sub-query and
+    keyword-matched tags. No LLM call.
+    """
+    complexity, timings = _complexity_with_timing(prompt, complexity, timings)
+    t0 = time.perf_counter()
+    entities = complexity["identified_entities"] or identify_noun_phrases(prompt)
+    tags = classify_tags_local(prompt)
+    parsed_response = {
+        "sub_queries": [
+            {"sub_query": prompt, "intent": "Understand", "entities": entities, "engine": "all"}
+        ]
+    }
+    timings["local"] = time.perf_counter() - t0
+    return _finish_analysis(parsed_response, complexity, tags, entities, None, "fast", timings)
+
+def analyze_query(prompt, mode=None):
+    """
+    Run the query analysis: the local fast path below FAST_PATH_THRESHOLD,
+    otherwise the configured LLM mode, falling back to the two-call path.
+    """
+    mode = mode or QUERY_ANALYSIS_MODE
+    complexity, timings = _complexity_with_timing(prompt, None, None)
+
+    if complexity["complexity_score"] < FAST_PATH_THRESHOLD:
+        return analyze_query_fast(prompt, complexity, timings)
+    if mode == "single":
+        try:
+            return analyze_query_single(prompt, complexity, timings)
+        except Exception as e:
+            print(f"Single-call analysis failed, falling back to two calls: {e}")
+            return decompose_prompt(prompt, "two_call_fallback", complexity, timings)
+    return decompose_prompt(prompt, complexity=complexity, timings=timings)
+
 if __name__ == "__main__":
     test_prompts = [
         "Who is Justin Bieber and what is the tea with Hailey Bieber?",
         "Why am I feeling so tired all the time. My doctor said it's because I have low blood sugar I'm so confused."
     ]
     for prompt in test_prompts:
-        print(decompose_prompt(prompt))
+        print(analyze_query(prompt))
@@ -3,34 +3,262 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from src.engine_router import validate_tags, rank_engines, TAGS
-from src.engine_loader import SEARCH_ENGINES
-from src.llm_prompt_analyser import decompose_prompt
-import google.generativeai as genai
+from src.engine_loader import SEARCH_ENGINES, BATCH_ENGINES
+from src.llm_prompt_analyser import analyze_query, local_entities
+from src.result_cache import normalize_query, coalesced_engine
+from src.singleflight import SingleFlight
+from src.urls import document_key
+from src.near_duplicates import remove_near_duplicates
+from src.passages import DEFAULT_TOKEN_BUDGET, select_passages
+from src.circuit_breaker import engine_health, guarded, is_open
+from src.tokens import item_tokens
+from src.hedging import record_oversubscription
 import json
 from src.jina_scraper import jina
+from src.request_context import RequestContext, current_request, DEFAULT_BUDGET
 from engines.deviantart import search_deviantart
 from engines.google_images import google_image_search
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 import time
 
-def parallel_scrape(scrape_func, links, engine, max_workers=10):
-    def wrapper(link):
+class DocumentRegistry:
+    """
+    Request-wide index of the documents already taken by an engine, keyed by
+    document_key(), so each document is returned once and credited to every
+    engine that surfaced it. A document is only taken once its content is
+    in; concurrent scrapes of it are coalesced by the scraper.
+    """
+    def __init__(self, on_attribution=None):
+        self.items = {}
+        self.duplicates = 0
+        self.on_attribution = on_attribution or (lambda item, engine: None)
+
+    def credit(self, url, engine):
+        """True if another engine already has `url`, crediting `engine` on its item."""
+        item = self.items.get(document_key(url)) if url else None
+        if item is None:
+            return False
+        self.duplicates += 1
+        if engine not in item["engines"]:
+            item["engines"].append(engine)
+            self.on_attribution(item, engine)
+        return True
+
+    def claim(self, url, engine):
+        """A new item for `url` (call once its content is in), or None if another engine already has it."""
+        if not url:
+            return new_item(url, engine)
+        if self.credit(url, engine):
+            return None
+        item = self.items[document_key(url)] = new_item(url, engine)
+        return item
+
+    def stats(self):
+        return {"documents": len(self.items), "duplicates_skipped": self.duplicates}
+
+# content gathered before scraping stops, as a multiple of the token budget
+# (passage selection needs more than it keeps to choose from)
+CONTENT_BUDGET_FACTOR = float(os.getenv("CONTENT_BUDGET_FACTOR", "3"))
+# distinct engines the content must come from before scraping stops early
+CONTENT_MIN_ENGINES = int(os.getenv("CONTENT_MIN_ENGINES", "2"))
+# extra links scraped per input for engines that scrape their results;
+# the first successful pages are kept and the slower rest cancelled (0 = off)
+SCRAPE_OVERSUBSCRIBE = int(os.getenv("SCRAPE_OVERSUBSCRIBE", "0"))
+
+class ContentBudget:
+    """
+    Request-wide cap on the tokens gathered by search and scrape. Once
+    enough tokens from enough distinct engines are in, the scrapes still
+    running are cancelled and the ones not started yet are skipped.
+    """
+    def __init__(self, tokens=None, min_engines=1, on_met=None):
+        # None = no limit
+        self.tokens = tokens
+        self.min_engines = min_engines
+        self.gathered = 0
+        self.engines = set()
+        self.scrapes = set()
+        self.met_at = None
+        self.counters = {"scrapes_cancelled": 0, "scrapes_skipped": 0}
+        self.on_met = on_met or (lambda budget: None)
+        self.started = time.perf_counter()
+
+    @property
+    def met(self):
+        return self.met_at is not None
+
+    def add(self, item):
+        self.gathered += item["tokens"]
+        self.engines.add(item["engine"])
+        if self.met or self.tokens is None:
+            return
+        if self.gathered >= self.tokens and len(self.engines) >= self.min_engines:
+            self.met_at = time.perf_counter() - self.started
+            current = asyncio.current_task()
+            for task in self.scrapes:
+                # the scrape reporting this item finishes on its own
+                if task is not current and not task.done():
+                    task.cancel()
+                    self.counters["scrapes_cancelled"] += 1
+            self.scrapes.clear()
+            self.on_met(self)
+
+    def track(self, task):
+        """Register a scrape so it can be cancelled once the budget is met."""
+        if not task.done():
+            self.scrapes.add(task)
+            task.add_done_callback(self.scrapes.discard)
+
+    def stats(self):
         return {
-            "context": scrape_func(link),
-            "citation": link,
-            "engine": engine
+            "tokens": self.tokens,
+            "min_engines": self.min_engines,
+            "gathered": self.gathered,
+            "engines": sorted(self.engines),
+            # seconds into search_and_scrape, None if never met
+            "met_after": self.met_at,
+            **self.counters
         }
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        return list(executor.map(wrapper, links))
+
+def new_item(citation, engine, context=None):
+    return {
+        "context": context,
+        "citation": citation,
+        "engine": engine,
+        # every engine that surfaced this document
+        "engines": [engine]
+    }
+
+def scrape_failed(context):
+    # src/jina_scraper returns upstream errors as text
+    return isinstance(context, str) and context.startswith("Error:")
+
+async def parallel_scrape(scrape_func, links, engine, on_item=None, registry=None, budget=None, keep=None,
+                          errors=None):
+    """
+    Scrape `links` concurrently. With `keep` the links are oversubscribed:
+    only the first `keep` pages that succeed are kept and the scrapes still
+    running after that are cancelled. A scrape that raises is handled like
+    an "Error:" page and noted in `errors`, it never stops its siblings.
+    """
+    # concurrency is capped globally (and per host) by the scheduler in src/http_client
+    kept = []
+    tasks = []
+
+    async def wrapper(link):
+        if budget is not None and budget.met:
+            # enough content already, don't start
+            budget.counters["scrapes_skipped"] += 1
+            return None
+        if registry is not None and registry.credit(link, engine):
+            # already fetched for another engine
+            return None
+        try:
+            context = await scrape_func(link)
+        except Exception as e:
+            print(f" scrape of {link} failed: {e}")
+            if errors is not None:
+                errors.append(str(e))
+            context = f"Error: {type(e).__name__}"
+
+        if scrape_failed(context):
+            if keep is not None:
+                return None
+            # reported, but left unclaimed so another engine can still fetch it
+            item = new_item(link, engine, context=context)
+        else:
+            if keep is not None and len(kept) >= keep:
+                return None
+            # claimed only now that there is content
+            item = registry.claim(link, engine) if registry is not None else new_item(link, engine)
+            if item is None:
+                return None
+            item["context"] = context
+
+        if keep is not None:
+            kept.append(item)
+            if len(kept) == keep:
+                current = asyncio.current_task()
+                cancelled = [task for task in tasks if task is not current and not task.done()]
+                for task in cancelled:
+                    task.cancel()
+                record_oversubscription(len(links) - keep, len(cancelled))
+
+        # publish each page as soon as it lands so a deadline keeps what finished
+        if on_item is not None:
+            on_item(item)
+        return item
+
+    tasks.extend(asyncio.create_task(wrapper(link)) for link in links)
+    if budget is not None:
+        for task in tasks:
+            budget.track(task)
+    # scrapes cancelled by the content budget or oversubscription come back as CancelledError
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return [item for item in results if isinstance(item, dict)]
     
-def safe_search(search_func, inputs):
+async def safe_search(search_func, inputs, errors=None, prefetched=None, **kwargs):
     try:
-        return search_func(inputs)
+        # a speculative task already searching these inputs is awaited instead
+        return await (prefetched if prefetched is not None else search_func(inputs, **kwargs))
     except Exception as e:
         print(f" {search_func.__name__} failed for '{inputs}': {e}")
+        if errors is not None:
+            errors.append(str(e))
         return []
 
+async def timed(latency, key, coro):
+    t0 = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        latency[key] = time.perf_counter() - t0
+
+async def wait_with_deadline(tasks, timeout, engine_status):
+    """
+    Wait for `tasks` (task -> engine name) for at most `timeout` seconds.
+    Stragglers are cancelled and marked "timed-out", tasks that raised are
+    marked "failed"; whatever they already wrote to the result lists is kept.
+    """
+    if not tasks:
+        return
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+    except asyncio.CancelledError:
+        # the caller went away (e.g. a stream client disconnected), stop the work too
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    for task in done:
+        if task.exception() is not None:
+            print(f" {tasks[task]} failed: {task.exception()}")
+            engine_status[tasks[task]] = "failed"
+    for task in pending:
+        task.cancel()
+        engine_status[tasks[task]] = "timed-out"
+    if pending:
+        await asyncio.wait(pending)
+
+def discard(task):
+    """Drop a speculative task: cancel it if running, else swallow its outcome."""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+IMAGE_SEARCH = {
+    "deviantart": coalesced_engine("deviantart", guarded("deviantart", search_deviantart)),
+    "google_images": coalesced_engine("google_images", guarded("google_images", google_image_search)),
+}
+
+# identical queries decomposing at the same time share one analysis
+inflight_decompositions = SingleFlight("decompositions")
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -38,7 +266,27 @@ class SearchBot:
     ENGINES_USE_SUBQUESTIONS = {"google", "wikipedia", "jina_search"}
     ENGINES_USE_ENTITIES = {"arxiv", "astrophysics_data_system", "goodreads", "hackernews","imdb", "reddit"}
     ENGINES_USE_ENTITIES_NO_SCRAPING = {"github", "huggingface", "openstreetmap", "steam"}
+    # return {"title", "url", "content"} straight from their API, scraped only when thin
+    ENGINES_STRUCTURED = {"arxiv", "astrophysics_data_system", "hackernews", "reddit", "wikipedia"}
+    MIN_STRUCTURED_CHARS = 400
+    # results the pipeline consumes per input, passed down as `limit=` so
+    # engines only request that many from upstream (default 1)
+    RESULT_LIMITS = {
+        "google": 2,
+        "jina_search": 3,
+        "github": 5,
+        "huggingface": 3,
+        "openstreetmap": 10,
+        "steam": 10,
+    }
+    # concurrent calls per engine job when it fans out over its inputs (default 3)
+    ENGINE_CONCURRENCY = {
+        "google": 5,
+        "jina_search": 5,
+        "wikipedia": 5,
+    }
     IMAGE_ENGINES = {"deviantart", "google_images"}
+    BASELINE_ENGINES = ["google", "jina_search"]
 
     def __init__(self, model="gemini-2.0-flash"):
         self.client = OpenAI(
@@ -47,9 +295,11 @@ class SearchBot:
         )
         self.model = model
 
-    def _get_subquestions(self, query: str):
+    async def _get_subquestions(self, query: str):
         logging.info("Decomposing the query")
-        result_json = decompose_prompt(query)
+        # query analysis is blocking (spaCy + LLM calls), keep it off the event loop
+        result_json = await inflight_decompositions.do(
+            query.strip(), lambda: asyncio.to_thread(analyze_query, query))
         try:
             result = json.loads(result_json)
             sub_queries = []
@@ -69,7 +319,8 @@ class SearchBot:
                 "sub_queries": sub_queries,
                 "entity_dic": entity_dic,
                 "tags": tags,
-                "complexity_score": complexity_score
+                "complexity_score": complexity_score,
+                "analysis": result.get("analysis", {})
             }
         except Exception as e:
             print(f"Error parsing subquestions: {e}")
@@ -77,7 +328,8 @@ class SearchBot:
                 "sub_queries": [],
                 "entity_dic": {},
                 "tags": [],
-                "complexity_score": []
+                "complexity_score": [],
+                "analysis": {}
             }
         
     def _get_top_entity_names(self, entity_dic, top_n=2):
@@ -106,20 +358,42 @@ class SearchBot:
         logging.info("Finding the engines")
         # Get tags and ranked engines
         tags = validate_tags(tags, TAGS)
-        selected_engines = rank_engines(tags=tags)
+        # engines with a poor recent record are demoted (open circuits drop out)
+        selected_engines = rank_engines(tags=tags, health=engine_health())
 
         # must always include our baseline engines
-        selected_engines += ["google", "jina_search"] 
+        selected_engines += self.BASELINE_ENGINES
         return selected_engines
         
-    def _gather_search_jobs(self, selected_engines, sub_questions, top_entity_names):
+    def _result_limit(self, engine):
+        return self.RESULT_LIMITS.get(engine, 1)
+
+    def _scrapes_links(self, engine):
+        return engine not in self.ENGINES_USE_ENTITIES_NO_SCRAPING | self.ENGINES_STRUCTURED | {"jina_search"}
+
+    def _search_limit(self, engine):
+        """Results requested upstream: the result limit, plus spare links to oversubscribe scrapes."""
+        if self._scrapes_links(engine):
+            return self._result_limit(engine) + SCRAPE_OVERSUBSCRIBE
+        return self._result_limit(engine)
+
+    def _engine_concurrency(self, engine):
+        return self.ENGINE_CONCURRENCY.get(engine, 3)
+
+    def _gather_search_jobs(self, selected_engines, sub_questions, top_entity_names, engine_status=None):
         jobs = []
+        engine_status = {} if engine_status is None else engine_status
 
         for engine in selected_engines:
             search_func = SEARCH_ENGINES.get(engine)
             if not search_func:
                 continue
 
+            # failing engine, don't wait for it to fail again
+            if is_open(engine):
+                engine_status[engine] = "circuit-open"
+                continue
+
             # Decide input source
             if engine in self.ENGINES_USE_SUBQUESTIONS:
                 inputs = sub_questions
@@ -128,143 +402,370 @@ class SearchBot:
             else:
                 continue
 
-            # Build job: (engine, search_func, inputs)
-            jobs.append((engine, search_func, inputs))
+            # several inputs to an engine that can batch them: one upstream call
+            batch_func = BATCH_ENGINES.get(engine) if len(inputs) > 1 else None
+
+            # Build job: (engine, search_func, inputs, batch_func)
+            jobs.append((engine, search_func, inputs, batch_func))
 
         return jobs
     
-    def _run_search_jobs(self, jobs):
-        def run_job(job):
-            engine, search_func, inputs = job
+    async def _run_search_jobs(self, jobs, on_item, engine_status, timeout=None, prefetched=None, input_latency=None,
+                               registry=None, budget=None):
+        prefetched = {} if prefetched is None else prefetched
+        input_latency = {} if input_latency is None else input_latency
+        # shared by every job, so a document two engines surface is fetched once
+        registry = DocumentRegistry() if registry is None else registry
+        budget = ContentBudget() if budget is None else budget
+
+        async def run_job(job):
+            engine, search_func, inputs, batch_func = job
+            errors = []
+            produced = []
+            limit = self._result_limit(engine)
+            search_limit = self._search_limit(engine)
+            semaphore = asyncio.Semaphore(self._engine_concurrency(engine))
+            timings = input_latency.setdefault(engine, {})
+
+            async def search(i):
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    try:
+                        # reuse a speculative search already running for this input
+                        return await safe_search(search_func, i, errors,
+                                                 prefetched.pop((engine, normalize_query(i)), None), limit=search_limit)
+                    finally:
+                        timings[i] = time.perf_counter() - t0
+
+            async def search_all():
+                """Results for every input, in input order, searched concurrently."""
+                if batch_func is None:
+                    return list(await asyncio.gather(*(search(i) for i in inputs)))
+                t0 = time.perf_counter()
+                by_input = await safe_search(batch_func, inputs, errors, limit=search_limit) or {}
+                # one upstream call answered all of them
+                timings.update({i: time.perf_counter() - t0 for i in inputs})
+                return [by_input.get(i, []) for i in inputs]
+
+            def emit(item):
+                # counted once here, budgeting and passage selection reuse it
+                item["tokens"] = item_tokens(item)
+                produced.append(item)
+                on_item(item)
+                budget.add(item)
+
+            def emit_document(url, context, label=engine):
+                item = registry.claim(url, label)
+                if item is not None:
+                    item["context"] = context
+                    emit(item)
+
             # Engines that return direct context (no scraping)
             if engine in self.ENGINES_USE_ENTITIES_NO_SCRAPING:
                 logging.info(f"Running searching on {engine} with inputs {inputs}")
-                return [{
-                    "context": safe_search(search_func,i),
-                    "citation": "NO_LINK_SINCE_NO_SCRAPING",
-                    "engine": engine
-                } for i in inputs]
+
+                async def search_and_emit(i):
+                    emit(new_item("NO_LINK_SINCE_NO_SCRAPING", engine, context=await search(i)))
+                await asyncio.gather(*(search_and_emit(i) for i in inputs))
             
             # Jina Search (special case, no scraping, returns JSON list)
-            if engine == "jina_search":
+            elif engine == "jina_search":
                 logging.info(f"Running Jina Search on inputs {inputs}")
-                all_results = []
-                for i in inputs:
-                    response = safe_search(search_func, i)
-                    if response.status_code == 200:
-                        data = response.json().get("data", [])
-                        for result in data[:3]: #limit to 3 results
-                            content = result.get("content", "")
-                            if not content:
-                                continue
-                            all_results.append({
-                                "context": content,
-                                "citation": result.get("url", ""),
-                                "engine": "Jina Search"
-                            })
-                return all_results
-
-            logging.info(f"Running searching on {engine} with inputs {inputs}")
-            # Step 1: Search one-by-one (simplified)
-            search_results = [safe_search(search_func,i) for i in inputs]
-
-            # Step 2: Choose how many links to use
-            num_links = 2 if engine == "google" else 1
-            links = []
-            for result in search_results:
-                links.extend(result[:num_links])
-
-            logging.info(f"Scraping links in parallel with jina on {engine} with inputs {links}")
-            # Step 3: Scrape links in parallel with jina
-            return parallel_scrape(jina, links, engine=engine)
-
-        # Run one job per engine, in parallel
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            all_results = executor.map(run_job, jobs)
-
-        # Flatten list of lists
-        return [item for result in all_results for item in result]
-
-    def _get_images(self, top_entity_names, top_images=3):
-        def get_images_for_entity(entity):
-            results = []
-            logging.info(f"Getting images for {entity} from deviantart")
-            results += safe_search(search_deviantart, entity)[:top_images]
-            logging.info(f"Getting images for {entity} from google images")
-            results += safe_search(google_image_search, entity)[:top_images]
-            return results
-
-        # Run get_images_for_entity in parallel per entity
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            all_results = executor.map(get_images_for_entity, top_entity_names)
-
-        # Flatten the results
-        return [img for res in all_results for img in res]
-
-    def _check_tokens(self, data: list):
-        logging.info("Checking tokens")
-        # Load the JSON file
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        total_tokens = 0
-
-        for item in data:
-            try:
-                # Count tokens for context
-                context_tokens = model.count_tokens(str(item["context"])).total_tokens
-                # Count tokens for citation (the link)
-                citation_tokens = model.count_tokens(item["citation"]).total_tokens
-                # Add both to total
-                total_tokens += context_tokens + citation_tokens
-            except Exception as e:
-                print(f"Token count error for item {e}")
-                total_tokens = "Error Calculating"
-
-        return total_tokens
-    
-    def main(self, query):
-        latency = {}
-        start_time = time.perf_counter()
 
-        # 1. Decompose prompt
-        t0 = time.perf_counter()
-        result = self._get_subquestions(query)
-        latency["decompose_prompt"] = time.perf_counter() - t0
+                async def search_and_emit(i):
+                    for result in await search(i):
+                        content = result.get("content", "")
+                        if not content:
+                            continue
+                        emit_document(result.get("url", ""), content, label="Jina Search")
+                await asyncio.gather(*(search_and_emit(i) for i in inputs))
+
+            # Engines whose API already returns the text (abstracts, selftext, extracts)
+            elif engine in self.ENGINES_STRUCTURED:
+                logging.info(f"Running structured search on {engine} with inputs {inputs}")
+                thin = []
+                for results in await search_all():
+                    for result in results[:limit]:
+                        if len(result["content"]) >= self.MIN_STRUCTURED_CHARS:
+                            emit_document(result["url"], result["content"])
+                        else:
+                            thin.append(result["url"])
+
+                # too little text from the API, fall back to scraping the page
+                if thin:
+                    logging.info(f"Scraping thin results with jina on {engine}: {thin}")
+                    await parallel_scrape(jina, thin, engine=engine, on_item=emit, registry=registry, budget=budget,
+                                          errors=errors)
+
+            else:
+                logging.info(f"Running searching on {engine} with inputs {inputs}")
+                # Step 1: Search every input (one call if the engine batches)
+                search_results = await search_all()
+
+                # Step 2: Collect the links (engines already return at most `search_limit`)
+                links = [link for result in search_results for link in result[:search_limit]]
+
+                async def scrape_input(result):
+                    candidates = result[:search_limit]
+                    wanted = min(limit, len(result))
+                    # with spares, keep the first `wanted` pages of this input
+                    keep = wanted if SCRAPE_OVERSUBSCRIBE and len(candidates) > wanted else None
+                    await parallel_scrape(jina, candidates, engine=engine, on_item=emit, registry=registry,
+                                          budget=budget, keep=keep, errors=errors)
+
+                logging.info(f"Scraping links in parallel with jina on {engine} with inputs {links}")
+                # Step 3: Scrape links in parallel with jina, every input concurrently
+                await asyncio.gather(*(scrape_input(result) for result in search_results))
+
+            # only call it a failure if the engine errored and produced nothing
+            engine_status[engine] = "failed" if errors and not produced else "ok"
+
+        # Run one job per engine, concurrently on the event loop
+        tasks = {asyncio.create_task(run_job(job)): job[0] for job in jobs}
+        await wait_with_deadline(tasks, timeout, engine_status)
+
+    async def _get_images(self, top_entity_names, images, engine_status, top_images=3, timeout=None, prefetched=None):
+        prefetched = {} if prefetched is None else prefetched
+
+        async def get_images(engine, search_func, entity):
+            logging.info(f"Getting images for {entity} from {engine}")
+            errors = []
+            task = prefetched.pop((engine, normalize_query(entity)), None)
+            images.extend((await safe_search(search_func, entity, errors, task))[:top_images])
+            if errors:
+                engine_status[engine] = "failed"
+
+        # One task per (image engine, entity), all running concurrently
+        tasks = {}
+        for engine, search_func in IMAGE_SEARCH.items():
+            if is_open(engine):
+                engine_status[engine] = "circuit-open"
+                continue
+            if top_entity_names:
+                engine_status[engine] = "ok"
+            for entity in top_entity_names:
+                tasks[asyncio.create_task(get_images(engine, search_func, entity))] = engine
+        await wait_with_deadline(tasks, timeout, engine_status)
+        return images
+
+    def _start_speculation(self, query):
+        """
+        Fire the baseline engines on the raw query, and image lookups for its
+        spaCy entities, before decomposition has finished.
+        """
+        searches = {
+            (engine, normalize_query(query)): asyncio.create_task(
+                SEARCH_ENGINES[engine](query, limit=self._search_limit(engine)))
+            for engine in self.BASELINE_ENGINES
+            if not is_open(engine)
+        }
 
-        sub_questions = result["sub_queries"]
-        entity_dic = result["entity_dic"]
-        tags = result["tags"]
+        async def speculate_images():
+            entities = await asyncio.to_thread(local_entities, query)
+            return {
+                (engine, normalize_query(entity)): asyncio.create_task(search_func(entity))
+                for entity in entities[:2]
+                for engine, search_func in IMAGE_SEARCH.items()
+                if not is_open(engine)
+            }
 
-        # 2. Select engines
-        t0 = time.perf_counter()
-        engines = self._find_engines(tags)
-        latency["select_engines"] = time.perf_counter() - t0
+        return searches, asyncio.create_task(speculate_images())
 
-        # 3. Get entities
-        t0 = time.perf_counter()
-        top_entity_names = self._get_top_entity_names(entity_dic, top_n=2)
-        latency["get_entities"] = time.perf_counter() - t0
+    async def _reconcile_speculation(self, query, speculation, sub_questions, top_entity_names):
+        """
+        Keep the speculative tasks the decomposed plan will ask for again and
+        discard the rest. Returns ({(engine, normalized input): task}, summary).
+        """
+        searches, image_task = speculation
+        try:
+            image_searches = await image_task
+        except Exception as e:
+            print(f"Speculative image lookup failed: {e}")
+            image_searches = {}
+
+        # a lone sub-query is a rewrite of the raw query, so the raw-query
+        # search stands in for it
+        if len(sub_questions) == 1:
+            searches = {
+                (engine, normalize_query(sub_questions[0])): task
+                for (engine, _), task in searches.items()
+            }
 
-        # 4. Run search + scrape
-        t0 = time.perf_counter()
-        jobs = self._gather_search_jobs(engines, sub_questions, top_entity_names)
-        info = self._run_search_jobs(jobs)
-        latency["search_and_scrape"] = time.perf_counter() - t0
+        wanted = {(e, normalize_query(q)) for e in self.BASELINE_ENGINES for q in sub_questions}
+        wanted |= {(e, normalize_query(n)) for e in IMAGE_SEARCH for n in top_entity_names}
 
-        # 5. Get images
-        t0 = time.perf_counter()
-        image_urls = self._get_images(top_entity_names)
-        latency["get_images"] = time.perf_counter() - t0
+        prefetched = {}
+        for key, task in {**searches, **image_searches}.items():
+            if key in wanted:
+                prefetched[key] = task
+            else:
+                discard(task)
 
-        # 6. Count tokens
+        summary = {
+            "launched": len(searches) + len(image_searches),
+            "reused": len(prefetched),
+            "discarded": len(searches) + len(image_searches) - len(prefetched)
+        }
+        return prefetched, summary
+
+    async def main(self, query, budget=None, token_budget=None, content_budget=None):
+        return await self._run_pipeline(query, budget, token_budget=token_budget, content_budget=content_budget)
+
+    async def stream(self, query, budget=None, token_budget=None, content_budget=None):
+        """
+        Same pipeline as main, but yields events as they happen: the
+        decomposition, then every info item the moment its engine/scrape
+        finishes, the images, the packed "context" (what main returns as
+        info), and a final "done" event with the latency block.
+        """
+        events = asyncio.Queue()
+        # The pipeline runs in its own task so its request context never
+        # leaks into whoever is iterating this generator
+        producer = asyncio.create_task(
+            self._run_pipeline(query, budget, publish=events.put_nowait, token_budget=token_budget,
+                               content_budget=content_budget))
+        producer.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            final_result = await producer
+        finally:
+            # the client went away mid-stream, stop the remaining work
+            producer.cancel()
+
+        yield {
+            "event": "done",
+            **{k: v for k, v in final_result.items() if k not in ("info", "images")}
+        }
+
+    async def _run_pipeline(self, query, budget=None, publish=None, token_budget=None, content_budget=None):
+        publish = publish or (lambda event: None)
+        token_budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+        if content_budget is None:
+            content_budget = int(token_budget * CONTENT_BUDGET_FACTOR)
+        latency = {}
+        engine_status = {}
+        start_time = time.perf_counter()
+
+        # Every stage below (and every upstream call) shares this deadline
+        ctx = RequestContext(DEFAULT_BUDGET if budget is None else budget)
+        token = current_request.set(ctx)
+        speculation = None
+        prefetched = {}
+        try:
+            # 0. Overlap decomposition with network I/O: search the raw query
+            # on the baseline engines and fetch images for its entities now
+            speculation = self._start_speculation(query)
+
+            # 1. Decompose prompt
+            t0 = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._get_subquestions(query), timeout=ctx.remaining())
+            except asyncio.TimeoutError:
+                logging.info("Decomposition ran out of budget, searching the raw query instead")
+                engine_status["decompose_prompt"] = "timed-out"
+                result = {"sub_queries": [query], "entity_dic": {}, "tags": [], "complexity_score": None, "analysis": {}}
+            latency["decompose_prompt"] = time.perf_counter() - t0
+            # which analysis path ran (single / two_call / fallback) and its split
+            latency["query_analysis"] = result["analysis"]
+
+            # no sub-queries means the analysis failed, the raw query stands in
+            sub_questions = result["sub_queries"] or [query]
+            entity_dic = result["entity_dic"]
+            tags = result["tags"]
+
+            # 2. Select engines
+            t0 = time.perf_counter()
+            engines = self._find_engines(tags)
+            latency["select_engines"] = time.perf_counter() - t0
+
+            # 3. Get entities
+            t0 = time.perf_counter()
+            top_entity_names = self._get_top_entity_names(entity_dic, top_n=2)
+            latency["get_entities"] = time.perf_counter() - t0
+
+            prefetched, speculation_summary = await self._reconcile_speculation(
+                query, speculation, sub_questions, top_entity_names)
+            speculation = None
+
+            publish({
+                "event": "decomposition",
+                "sub_queries": sub_questions,
+                "entities": top_entity_names,
+                "tags": tags,
+                "engines": engines
+            })
+
+            # 4 + 5. Search + scrape and images only depend on the entities, so
+            # run them side by side within the remaining budget
+            jobs = self._gather_search_jobs(engines, sub_questions, top_entity_names, engine_status)
+            info = []
+            image_urls = []
+
+            def on_item(item):
+                info.append(item)
+                publish({"event": "item", "item": item})
+
+            def on_attribution(item, engine):
+                publish({"event": "attribution", "citation": item["citation"], "engine": engine})
+            documents = DocumentRegistry(on_attribution)
+
+            def on_budget_met(content):
+                logging.info(f"Content budget met with {content.gathered} tokens, stopping the remaining scrapes")
+                publish({"event": "content_budget", **content.stats()})
+            # 0 = keep scraping everything; never wait on more engines than were selected
+            content = ContentBudget(content_budget or None, min(CONTENT_MIN_ENGINES, len(jobs)), on_budget_met)
+
+            async def image_stage():
+                await self._get_images(top_entity_names, image_urls, engine_status,
+                                       timeout=ctx.remaining(), prefetched=prefetched)
+                publish({"event": "images", "images": image_urls})
+
+            # seconds per (engine, input) search, filled in as they finish
+            latency["search_per_input"] = {}
+            await asyncio.gather(
+                timed(latency, "search_and_scrape",
+                      self._run_search_jobs(jobs, on_item, engine_status,
+                                            timeout=ctx.remaining(), prefetched=prefetched,
+                                            input_latency=latency["search_per_input"],
+                                            registry=documents, budget=content)),
+                timed(latency, "get_images", image_stage()),
+            )
+
+            # 5b. Drop mirrors / syndicated copies the URL dedupe could not see
+            t0 = time.perf_counter()
+            info, near_duplicates = await asyncio.to_thread(remove_near_duplicates, info)
+            latency["near_duplicates"] = time.perf_counter() - t0
+            if near_duplicates["removed"]:
+                publish({"event": "near_duplicates", "removed": near_duplicates["citations"]})
+
+            # 5c. Keep only the passages most relevant to the query, within the token budget
+            passages = None
+            if token_budget:
+                t0 = time.perf_counter()
+                queries = [query, *sub_questions, *entity_dic]
+                info, passages = await asyncio.to_thread(select_passages, info, queries, token_budget)
+                latency["select_passages"] = time.perf_counter() - t0
+                publish({"event": "context", "info": info})
+        finally:
+            # speculative work nobody claimed (or left behind by an error)
+            if speculation is not None:
+                searches, image_task = speculation
+                prefetched = {**prefetched, **searches}
+                discard(image_task)
+            for task in prefetched.values():
+                discard(task)
+            current_request.reset(token)
+
+        # 6. Count tokens (local estimate, each item carries its own count)
         t0 = time.perf_counter()
-        #tokens = self._check_tokens(info)
-        tokens = "NOT IMPLEMENTED"
+        tokens = sum(item["tokens"] for item in info)
         latency["token_check"] = time.perf_counter() - t0
 
         # Total time
         latency["total"] = time.perf_counter() - start_time
+        # time spent queued for shared resources (scheduler slots, rate limits)
+        latency["waits"] = dict(ctx.wait_time)
 
         # Final result
         final_result = {
@@ -272,6 +773,20 @@ class SearchBot:
             "info": info,
             "images": image_urls, 
             "tokens": tokens,
+            # fast (local, no LLM) / single / two_call / two_call_fallback
+            "analysis_path": result["analysis"].get("mode"),
+            "engine_status": engine_status,
+            "speculation": speculation_summary,
+            # documents surfaced by more than one engine, fetched once
+            "dedupe": {**documents.stats(), "near_duplicates": near_duplicates},
+            # tokens gathered before scraping stopped, and scrapes it saved
+            "content_budget": content.stats(),
+            # tokens in vs out of passage selection (None when disabled)
+            "passages": passages,
+            "budget": {
+                "seconds": ctx.budget,
+                "exceeded": ctx.expired()
+            },
             "latency": latency
         }
 
@@ -295,7 +810,7 @@ if __name__ == "__main__":
     #query = "What is a black hole?"
     #query = "Best romantic movies"
     #query = "What is the cutest cat for me to buy?"
-    bot.main(query)
+    asyncio.run(bot.main(query))
 
 # FIGURE OUT LATER
 # PROBLEM!!! Similar books to harry potter (how can we use goodreads?)
@@ -0,0 +1,82 @@
+"""
+Near-duplicate removal over scraped `context` bodies.
+
+Each body is reduced to a bottom-k MinHash sketch of its word shingles
+(the k smallest shingle hashes), which estimates the Jaccard similarity
+of two bodies from the sketches alone. Mirrors and syndicated copies
+above the threshold collapse into one item: the copy credited to the most
+engines, with a real citation, and then the longest.
+"""
+import hashlib
+import heapq
+import os
+import re
+
+from src.tokens import estimate_tokens
+
+THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+SHINGLE_WORDS = 5
+SKETCH_SIZE = 128
+# shorter bodies (error strings, stubs) are left alone
+MIN_WORDS = 50
+
+_WORD = re.compile(r"\w+")
+
+
+def sketch(text, k=SKETCH_SIZE, shingle_words=SHINGLE_WORDS):
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + shingle_words]) for i in range(max(1, len(words) - shingle_words + 1))}
+    hashes = (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles)
+    return frozenset(heapq.nsmallest(k, hashes))
+
+
+def similarity(a, b, k=SKETCH_SIZE) -> float:
+    """Estimated Jaccard similarity of two bodies from their sketches."""
+    union = heapq.nsmallest(k, a | b)
+    if not union:
+        return 0.0
+    return sum(1 for h in union if h in a and h in b) / len(union)
+
+
+def _rank(item):
+    return (
+        len(item.get("engines", [])),
+        item["citation"].startswith("http"),
+        len(item["context"]),
+    )
+
+
+def remove_near_duplicates(items, threshold=THRESHOLD):
+    """
+    Returns (kept items in their original order, report). Dropped copies
+    credit their engines to the kept item.
+    """
+    candidates = [
+        (item, sketch(item["context"]))
+        for item in items
+        if isinstance(item["context"], str) and len(_WORD.findall(item["context"])) >= MIN_WORDS
+    ]
+
+    # best copies first, so each cluster is kept by its best member
+    candidates.sort(key=lambda pair: _rank(pair[0]), reverse=True)
+    kept = []
+    dropped = []
+    for item, item_sketch in candidates:
+        original = next((k for k, k_sketch in kept if similarity(item_sketch, k_sketch) >= threshold), None)
+        if original is None:
+            kept.append((item, item_sketch))
+            continue
+        dropped.append(item)
+        for engine in item.get("engines", [item["engine"]]):
+            if engine not in original.setdefault("engines", [original["engine"]]):
+                original["engines"].append(engine)
+        original.setdefault("near_duplicates", []).append(item["citation"])
+
+    dropped_ids = {id(item) for item in dropped}
+    report = {
+        "removed": len(dropped),
+        "citations": [item["citation"] for item in dropped],
+        "bytes_removed": sum(len(item["context"].encode("utf-8")) for item in dropped),
+        "tokens_removed": sum(estimate_tokens(item["context"]) for item in dropped),
+    }
+    return [item for item in items if id(item) not in dropped_ids], report
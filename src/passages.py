@@ -0,0 +1,149 @@
+"""
+Passage selection for the context handed to the downstream LLM.
+
+Each scraped `context` is chunked into passages of roughly
+PASSAGE_TOKENS, every passage is scored with BM25 against the query, its
+sub-queries and entities, and the best ones are packed into a token
+budget. Documents keep their citation; only their selected passages
+survive, in document order.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+from src.tokens import estimate_tokens, item_tokens
+
+# Default context budget per request in tokens (0 disables selection)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+PASSAGE_TOKENS = 150
+K1 = 1.5
+B = 0.75
+# marks text left out between two selected passages of one document
+GAP = "\n\n[...]\n\n"
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "why", "with",
+}
+
+
+def terms(text):
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _split_words(paragraph, size):
+    """Cut an oversized paragraph at word boundaries into pieces of about `size` tokens."""
+    piece, cost = [], 0
+    for word in paragraph.split(" "):
+        word_cost = estimate_tokens(word)
+        if piece and cost + word_cost > size:
+            yield " ".join(piece)
+            piece, cost = [], 0
+        piece.append(word)
+        cost += word_cost
+    if piece:
+        yield " ".join(piece)
+
+
+def chunk(text, size=PASSAGE_TOKENS):
+    """Split on paragraphs, merging short ones and cutting long ones to about `size` tokens."""
+    passages = []
+    current = ""
+    for paragraph in _PARAGRAPH.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > size:
+            if current:
+                passages.append(current)
+                current = ""
+            passages.extend(_split_words(paragraph, size))
+            continue
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if current and estimate_tokens(candidate) > size:
+            passages.append(current)
+            current = paragraph
+        else:
+            current = candidate
+    if current:
+        passages.append(current)
+    return passages
+
+
+def bm25_scores(passages, query_terms):
+    """BM25 score of every passage (list of term lists) against `query_terms`."""
+    n = len(passages)
+    if not n:
+        return []
+    avg_len = sum(len(p) for p in passages) / n or 1
+    df = Counter(term for p in passages for term in set(p))
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in set(query_terms)}
+
+    scores = []
+    for p in passages:
+        tf = Counter(p)
+        score = 0.0
+        for term in query_terms:
+            if tf[term]:
+                score += idf[term] * tf[term] * (K1 + 1) / (tf[term] + K1 * (1 - B + B * len(p) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def select_passages(items, queries, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Returns (items trimmed to their best passages within `token_budget`,
+    report). Non-text contexts (engine payloads) compete as one passage and
+    are kept whole if selected.
+    """
+    # (item index, position in document, text)
+    passages = []
+    for index, item in enumerate(items):
+        context = item["context"]
+        if isinstance(context, str):
+            passages.extend((index, position, text) for position, text in enumerate(chunk(context)))
+        else:
+            passages.append((index, 0, str(context)))
+
+    query_terms = [t for q in queries for t in terms(q)]
+    scores = bm25_scores([terms(text) for _, _, text in passages], query_terms)
+    tokens_in = sum(estimate_tokens(text) for _, _, text in passages)
+
+    # greedy by score; a passage that does not fit is skipped for smaller ones
+    chosen = {}
+    used = 0
+    for score, (index, position, text) in sorted(zip(scores, passages), key=lambda pair: -pair[0]):
+        cost = estimate_tokens(text)
+        if used + cost > token_budget:
+            continue
+        chosen.setdefault(index, []).append((position, text))
+        used += cost
+
+    selected = []
+    for index, item in enumerate(items):
+        if index not in chosen:
+            continue
+        if not isinstance(item["context"], str):
+            selected.append(item)
+            continue
+        parts = sorted(chosen[index])
+        context = parts[0][1]
+        for (previous, _), (position, text) in zip(parts, parts[1:]):
+            context += ("\n\n" if position == previous + 1 else GAP) + text
+        trimmed = {**item, "context": context}
+        trimmed["tokens"] = item_tokens(trimmed)
+        selected.append(trimmed)
+
+    report = {
+        "token_budget": token_budget,
+        "tokens_in": tokens_in,
+        "tokens_out": used,
+        "passages_considered": len(passages),
+        "passages_selected": sum(len(parts) for parts in chosen.values()),
+        "documents_dropped": len(items) - len(selected),
+    }
+    return selected, report
@@ -0,0 +1,129 @@
+"""
+Per-upstream rate limiting for src/http_client.py.
+
+Each host gets a token bucket (declared `rate` requests/second and `burst`
+in src/upstream_config.yaml), honours Retry-After from 429/503 responses,
+and adapts its concurrency AIMD-style: halve on 429/5xx or transport
+errors, grow by roughly one slot per window of successes. The scheduler
+reads `limit()` as the host's current concurrency cap.
+"""
+import time
+from email.utils import parsedate_to_datetime
+
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    """The wait for a token would outlive the request budget."""
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until the next token would be free."""
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        """Take the next token (possibly one not minted yet) and return the wait for it."""
+        wait = self.wait_time()
+        self.tokens -= 1
+        return wait
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamLimiter:
+    def __init__(self, rate=None, burst=1, max_concurrency=8, min_concurrency=1):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.blocked_until = 0.0
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self.counters = {
+            "acquired": 0,
+            "delayed": 0,           # had to wait for a token or Retry-After
+            "rejected": 0,          # wait would have exceeded the budget
+            "total_wait": 0.0,
+            "backoffs": 0,
+            "retry_after": 0,
+        }
+
+    def limit(self) -> int:
+        return int(self.concurrency)
+
+    def delay(self) -> float:
+        blocked = max(0.0, self.blocked_until - time.monotonic())
+        return max(blocked, self.bucket.wait_time() if self.bucket else 0.0)
+
+    def reserve(self, remaining=None) -> float:
+        """
+        Claim the right to send one request and return how long to sleep
+        first. Raises RateLimitExceeded instead if that is longer than
+        `remaining` seconds.
+        """
+        wait = self.delay()
+        if remaining is not None and wait > remaining:
+            self.counters["rejected"] += 1
+            raise RateLimitExceeded(f"rate limited for {wait:.1f}s, {remaining:.1f}s of budget left")
+
+        if self.bucket:
+            wait = max(wait, self.bucket.reserve())
+        self.counters["acquired"] += 1
+        if wait > 0:
+            self.counters["delayed"] += 1
+            self.counters["total_wait"] += wait
+        return wait
+
+    def cancel(self):
+        """Hand back a reservation that was never used."""
+        if self.bucket:
+            self.bucket.refund()
+
+    def on_response(self, status, headers):
+        if status in BACKOFF_STATUSES:
+            self.backoff()
+            retry_after = retry_after_seconds(headers.get("Retry-After"))
+            if retry_after is not None and status in (429, 503):
+                self.counters["retry_after"] += 1
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        else:
+            # additive increase: about one extra slot per `concurrency` successes
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def backoff(self):
+        """Multiplicative decrease, e.g. on a 429, 5xx or connection error."""
+        self.counters["backoffs"] += 1
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        stats["concurrency"] = self.limit()
+        stats["max_concurrency"] = self.max_concurrency
+        stats["rate"] = self.bucket.rate if self.bucket else None
+        stats["blocked_for"] = max(0.0, self.blocked_until - time.monotonic())
+        return stats
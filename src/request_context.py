@@ -0,0 +1,42 @@
+"""
+Per-request state shared by every stage of SearchBot.main.
+
+The active request is kept in a ContextVar so engines and the HTTP layer
+can read its deadline without it being threaded through every call.
+"""
+import os
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+
+# Default latency budget for a /search call, in seconds (0 disables it)
+DEFAULT_BUDGET = float(os.getenv("SEARCH_BUDGET_SECONDS", "30"))
+
+
+class RequestContext:
+    def __init__(self, budget=None):
+        self.budget = budget if budget else None
+        self.started = time.monotonic()
+        self.deadline = self.started + self.budget if self.budget else None
+        # used by src/scheduler.py to share slots fairly between requests
+        self.id = uuid.uuid4().hex[:8]
+        # seconds spent waiting (e.g. for a scheduler slot), by cause
+        self.wait_time = defaultdict(float)
+
+    def remaining(self):
+        """Seconds left in the budget, or None if the request is unbounded."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+current_request = ContextVar("current_request", default=None)
+
+
+def remaining_budget():
+    ctx = current_request.get()
+    return ctx.remaining() if ctx else None
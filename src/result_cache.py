@@ -0,0 +1,185 @@
+"""
+Search-result cache for the callables in src/engine_loader.SEARCH_ENGINES.
+
+Entries are keyed by (engine, normalized input, kwargs) with per-engine
+TTLs from src/cache_config.yaml. Expired entries are served immediately
+(stale-while-revalidate) while one background task refreshes them.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import re
+import time
+
+from cachetools import LRUCache
+
+from src.scrape_cache import CACHE_CONFIG
+from src.singleflight import SingleFlight
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text) -> str:
+    """Case-, whitespace- and punctuation-insensitive form of an engine input."""
+    text = _PUNCTUATION.sub(" ", str(text).lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class ResultCache:
+    def __init__(self, max_entries, default_ttl, max_stale=0, ttls=None):
+        # entries are (expires_at, value)
+        self.entries = LRUCache(maxsize=max_entries)
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.ttls = ttls or {}
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        self._refreshing = {}
+        # concurrent misses for the same key share one upstream call
+        self.inflight = SingleFlight("engine_searches")
+
+    def ttl_for(self, engine: str) -> float:
+        return self.ttls.get(engine, self.default_ttl)
+
+    def key(self, engine, query, kwargs):
+        return (engine, normalize_query(query), tuple(sorted(kwargs.items())))
+
+    async def fetch(self, engine, search_func, query, **kwargs):
+        key = self.key(engine, query, kwargs)
+        entry = self.entries.get(key)
+        now = time.time()
+
+        if entry is not None:
+            expires_at, value = entry
+            if now < expires_at:
+                self.counters["hits"] += 1
+                return value
+            if now < expires_at + self.max_stale:
+                self.counters["stale_hits"] += 1
+                self._refresh_in_background(key, engine, query,
+                                            lambda: self._load(key, engine, search_func, query, kwargs))
+                return value
+
+        self.counters["misses"] += 1
+        return await self.inflight.do(key, lambda: self._load(key, engine, search_func, query, kwargs))
+
+    async def fetch_many(self, engine, batch_func, queries, **kwargs):
+        """
+        Batch counterpart of fetch(): cached inputs are served per input,
+        stale ones too while one batch refreshes them in the background, and
+        only the misses go to `batch_func(misses, **kwargs)` -> {query: result}.
+        Results are cached per input, exactly as fetch() would store them.
+        """
+        found = {}
+        stale = []
+        misses = []
+        now = time.time()
+        for query in queries:
+            entry = self.entries.get(self.key(engine, query, kwargs))
+            if entry is not None and now < entry[0]:
+                self.counters["hits"] += 1
+                found[query] = entry[1]
+            elif entry is not None and now < entry[0] + self.max_stale:
+                self.counters["stale_hits"] += 1
+                found[query] = entry[1]
+                stale.append(query)
+            else:
+                self.counters["misses"] += 1
+                misses.append(query)
+
+        if stale:
+            key = self.batch_key(engine, stale, kwargs)
+            self._refresh_in_background(key, engine, stale,
+                                        lambda: self._load_many(engine, batch_func, stale, kwargs))
+        if misses:
+            # concurrent identical batches share one upstream call
+            key = self.batch_key(engine, misses, kwargs)
+            fetched = await self.inflight.do(key, lambda: self._load_many(engine, batch_func, misses, kwargs))
+            for query in misses:
+                found[query] = fetched.get(normalize_query(query), [])
+        return found
+
+    def batch_key(self, engine, queries, kwargs):
+        return (engine, tuple(sorted({normalize_query(q) for q in queries})), tuple(sorted(kwargs.items())))
+
+    async def _load_many(self, engine, batch_func, queries, kwargs):
+        """Run the batch and cache each non-empty result; returns {normalized query: result}."""
+        fetched = await batch_func(queries, **kwargs)
+        values = {}
+        for query in queries:
+            value = fetched.get(query, [])
+            if value:
+                self.entries[self.key(engine, query, kwargs)] = (time.time() + self.ttl_for(engine), value)
+            values[normalize_query(query)] = value
+        return values
+
+    async def _load(self, key, engine, search_func, query, kwargs):
+        value = await search_func(query, **kwargs)
+        # engines swallow their own errors and return an empty result, so
+        # empty results are not cached and get retried on the next call
+        if value:
+            self.entries[key] = (time.time() + self.ttl_for(engine), value)
+        return value
+
+    def _refresh_in_background(self, key, engine, query, load):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            self.counters["refreshes"] += 1
+            try:
+                await load()
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                logging.info(f"Background refresh of {engine} for '{query}' failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        # fresh context: the refresh must not inherit the caller's request deadline
+        self._refreshing[key] = asyncio.create_task(refresh(), context=contextvars.Context())
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        stats["entries"] = len(self.entries)
+        stats["refreshing"] = len(self._refreshing)
+        return stats
+
+
+def cached_engine(engine, search_func):
+    """Wrap an engine's search function so every call goes through the result cache."""
+    @functools.wraps(search_func)
+    async def wrapper(query, **kwargs):
+        return await result_cache.fetch(engine, search_func, query, **kwargs)
+    return wrapper
+
+
+def coalesced_engine(engine, search_func):
+    """
+    Share concurrent identical calls without caching the result, for
+    engines kept out of the result cache (image search).
+    """
+    @functools.wraps(search_func)
+    async def wrapper(query, **kwargs):
+        key = result_cache.key(engine, query, kwargs)
+        return await result_cache.inflight.do(key, lambda: search_func(query, **kwargs))
+    return wrapper
+
+
+def cached_batch_engine(engine, batch_func):
+    """Same as cached_engine() for an engine's batch entry point."""
+    @functools.wraps(batch_func)
+    async def wrapper(queries, **kwargs):
+        return await result_cache.fetch_many(engine, batch_func, queries, **kwargs)
+    return wrapper
+
+
+_config = CACHE_CONFIG["engines"]
+result_cache = ResultCache(
+    max_entries=_config["max_entries"],
+    default_ttl=_config["default_ttl"],
+    max_stale=_config.get("max_stale", 0),
+    ttls=_config.get("ttls"),
+)
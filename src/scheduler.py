@@ -0,0 +1,126 @@
+"""
+Process-wide scheduler for outbound work.
+
+Every upstream call waits here for a slot. There is a fixed global worker
+budget plus a concurrency limit per host (e.g. at most N calls to
+r.jina.ai at once). Waiters are grouped by request and served round-robin,
+so one heavy /search cannot starve the others.
+"""
+import asyncio
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+
+from src.request_context import current_request
+
+
+class Scheduler:
+    def __init__(self, max_workers, host_limit):
+        self.max_workers = max_workers
+        # callable: host -> max concurrent calls to that host
+        self.host_limit = host_limit
+        self.active = 0
+        self.active_by_host = defaultdict(int)
+        # request id -> deque of (host, future, enqueued_at), in round-robin order
+        self.queues = OrderedDict()
+        self.counters = {
+            "scheduled": 0,
+            "queued": 0,            # calls that had to wait at all
+            "max_queue_depth": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+        self.wait_by_host = defaultdict(float)
+
+    @asynccontextmanager
+    async def slot(self, host):
+        ctx = current_request.get()
+        request_id = ctx.id if ctx else "background"
+
+        waited = await self._acquire(host, request_id)
+        if ctx is not None:
+            ctx.wait_time["scheduler"] += waited
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def queue_depth(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def _acquire(self, host, request_id):
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(request_id, deque()).append((host, future, enqueued_at))
+        self._dispatch()
+
+        if not future.done():
+            self.counters["queued"] += 1
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.queue_depth())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was granted just as we were cancelled, hand it back
+                self._release(host)
+            else:
+                self._forget(request_id, future)
+            raise
+
+        waited = time.monotonic() - enqueued_at
+        self.counters["total_wait"] += waited
+        self.counters["max_wait"] = max(self.counters["max_wait"], waited)
+        self.wait_by_host[host] += waited
+        return waited
+
+    def _release(self, host):
+        self.active -= 1
+        self.active_by_host[host] -= 1
+        self._dispatch()
+
+    def _forget(self, request_id, future):
+        queue = self.queues.get(request_id)
+        if queue is None:
+            return
+        for entry in queue:
+            if entry[1] is future:
+                queue.remove(entry)
+                break
+        if not queue:
+            del self.queues[request_id]
+
+    def _dispatch(self):
+        """Hand out free slots, one per request per pass, rotating through requests."""
+        progressed = True
+        while progressed and self.active < self.max_workers:
+            progressed = False
+            for request_id in list(self.queues):
+                if self.active >= self.max_workers:
+                    break
+                queue = self.queues[request_id]
+                # first waiter of this request whose host still has room
+                for entry in queue:
+                    host, future, _ = entry
+                    if self.active_by_host[host] < self.host_limit(host):
+                        queue.remove(entry)
+                        self.active += 1
+                        self.active_by_host[host] += 1
+                        self.counters["scheduled"] += 1
+                        future.set_result(None)
+                        progressed = True
+                        break
+                if queue:
+                    self.queues.move_to_end(request_id)
+                else:
+                    del self.queues[request_id]
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        stats["avg_wait"] = stats["total_wait"] / stats["scheduled"] if stats["scheduled"] else 0.0
+        stats["max_workers"] = self.max_workers
+        stats["active"] = self.active
+        stats["queue_depth"] = self.queue_depth()
+        stats["waiting_requests"] = len(self.queues)
+        stats["active_by_host"] = {h: n for h, n in self.active_by_host.items() if n}
+        stats["wait_by_host"] = dict(self.wait_by_host)
+        return stats
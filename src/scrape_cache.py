@@ -0,0 +1,150 @@
+"""
+Content cache in front of jina(), keyed by document_key() so http/https,
+www. and tracking-parameter variants of a page share one entry.
+
+Two tiers: a size-bounded in-memory LRU (cachetools) and an optional
+SQLite file that survives restarts. Bodies are zlib-compressed in both
+and expire on a per-domain TTL from src/cache_config.yaml.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import yaml
+from cachetools import LRUCache
+
+from src.urls import document_key, match_domain
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "cache_config.yaml")
+
+with open(CONFIG_PATH, "r") as f:
+    CACHE_CONFIG = yaml.safe_load(f)
+
+
+class ScrapeCache:
+    def __init__(self, memory_bytes, default_ttl, domain_ttls=None, disk_path=None, compression_level=6):
+        # entries are (expires_at, compressed body), sized by the compressed body
+        self.memory = LRUCache(maxsize=memory_bytes, getsizeof=lambda entry: len(entry[1]))
+        self.default_ttl = default_ttl
+        self.domain_ttls = domain_ttls or {}
+        self.compression_level = compression_level
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "bytes_raw": 0,         # uncompressed bytes written
+            "bytes_compressed": 0,  # compressed bytes written
+            "bytes_served": 0,      # uncompressed bytes returned on hits
+        }
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS scrape_cache "
+                    "(url TEXT PRIMARY KEY, expires_at REAL, body BLOB)"
+                )
+                self._db.execute("DELETE FROM scrape_cache WHERE expires_at < ?", (time.time(),))
+
+    def ttl_for(self, url: str) -> float:
+        return match_domain(url, self.domain_ttls, self.default_ttl)
+
+    async def get(self, url: str):
+        key = document_key(url)
+        now = time.time()
+
+        entry = self.memory.get(key)
+        tier = "memory_hits"
+        if entry is None and self._db is not None:
+            entry = await asyncio.to_thread(self._disk_get, key)
+            tier = "disk_hits"
+            if entry is not None and entry[0] > now:
+                self._remember(key, entry)
+
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if entry[0] <= now:
+            self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            self.memory.pop(key, None)
+            return None
+
+        content = zlib.decompress(entry[1]).decode("utf-8")
+        self.counters["hits"] += 1
+        self.counters[tier] += 1
+        self.counters["bytes_served"] += len(content.encode("utf-8"))
+        return content
+
+    async def set(self, url: str, content: str):
+        key = document_key(url)
+        raw = content.encode("utf-8")
+        entry = (time.time() + self.ttl_for(url), zlib.compress(raw, self.compression_level))
+
+        self._remember(key, entry)
+        self.counters["stores"] += 1
+        self.counters["bytes_raw"] += len(raw)
+        self.counters["bytes_compressed"] += len(entry[1])
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, entry)
+
+    def _remember(self, key, entry):
+        try:
+            self.memory[key] = entry
+        except ValueError:
+            # larger than the whole memory tier, leave it to disk
+            pass
+
+    def _disk_get(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT expires_at, body FROM scrape_cache WHERE url = ?", (key,)
+            ).fetchone()
+        return row
+
+    def _disk_set(self, key, entry):
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scrape_cache (url, expires_at, body) VALUES (?, ?, ?)",
+                (key, entry[0], entry[1]),
+            )
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["memory_bytes"] = self.memory.currsize
+        stats["disk_enabled"] = self._db is not None
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+
+def _from_config(config):
+    disk_path = os.getenv("SCRAPE_CACHE_PATH") or config.get("disk_path")
+    if disk_path:
+        logging.info(f"Scrape cache persisted to {disk_path}")
+    return ScrapeCache(
+        memory_bytes=config["memory_bytes"],
+        default_ttl=config["default_ttl"],
+        domain_ttls=config.get("domain_ttls"),
+        disk_path=disk_path,
+        compression_level=config.get("compression_level", 6),
+    )
+
+
+scrape_cache = _from_config(CACHE_CONFIG["scrape"])
@@ -0,0 +1,98 @@
+"""
+In-flight request coalescing ("singleflight").
+
+Concurrent callers asking for the same key share one running task and its
+result instead of each doing the work. The shared task is shielded from
+any single caller's cancellation and only cancelled once every caller
+waiting on it has gone. It runs under its own SharedRequest, so no
+single caller's deadline cuts it short, while each caller still enforces
+its own deadline while waiting on it.
+"""
+import asyncio
+import contextvars
+
+from src.request_context import RequestContext, current_request, remaining_budget
+
+# every group by name, for the admin endpoint
+groups = {}
+
+
+class SharedRequest(RequestContext):
+    """
+    Request context of shared work: the first caller's id (for scheduler
+    fairness) and the latest deadline of the callers still waiting on it.
+    """
+    def __init__(self, first):
+        super().__init__()
+        if first is not None:
+            self.id = first.id
+        self.waiters = []
+
+    def join(self, ctx):
+        self.waiters.append(ctx)
+        self._update_deadline()
+
+    def leave(self, ctx):
+        self.waiters.remove(ctx)
+        self._update_deadline()
+
+    def _update_deadline(self):
+        # an unbounded caller (or none at all) leaves the work unbounded
+        deadlines = [ctx.deadline if ctx is not None else None for ctx in self.waiters]
+        self.deadline = None if not deadlines or None in deadlines else max(deadlines)
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        # key -> [task, number of callers waiting on it, SharedRequest]
+        self.calls = {}
+        self.counters = {"calls": 0, "coalesced": 0}
+        groups[name] = self
+
+    async def do(self, key, factory):
+        """Return the result of `factory()`, sharing it with concurrent callers of `key`."""
+        caller = current_request.get()
+        call = self.calls.get(key)
+        if call is None:
+            shared = SharedRequest(caller)
+            # fresh context: the shared work must not inherit the first caller's deadline
+            context = contextvars.Context()
+            context.run(current_request.set, shared)
+            task = asyncio.create_task(factory(), context=context)
+            call = self.calls[key] = [task, 0, shared]
+            call[0].add_done_callback(lambda _: self._forget(key, call))
+            self.counters["calls"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        call[1] += 1
+        shared = call[2]
+        shared.join(caller)
+        try:
+            return await asyncio.wait_for(asyncio.shield(call[0]), timeout=remaining_budget())
+        finally:
+            shared.leave(caller)
+            if caller is not None:
+                # the shared work's queueing (scheduler, rate limits) delayed this caller too
+                for cause, seconds in shared.wait_time.items():
+                    caller.wait_time[cause] += seconds
+            call[1] -= 1
+            if call[1] == 0 and not call[0].done():
+                # the last caller left (e.g. its deadline passed), nobody needs the result
+                call[0].cancel()
+
+    def _forget(self, key, call):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    def stats(self) -> dict:
+        stats = dict(self.counters)
+        total = stats["calls"] + stats["coalesced"]
+        stats["coalesce_rate"] = stats["coalesced"] / total if total else 0.0
+        stats["in_flight"] = len(self.calls)
+        return stats
+
+
+def coalescing_stats() -> dict:
+    return {name: group.stats() for name, group in groups.items()}
@@ -0,0 +1,58 @@
+"""
+Local token counts for the text we hand to the downstream LLM.
+
+Counting remotely (model.count_tokens) costs a network call per string,
+so counts are estimated here from the shape of the text: subword
+tokenizers keep common words whole, split long words and numbers into
+pieces, give punctuation its own token and spend about a token per
+character on non-Latin scripts. TOKEN_SCALE calibrates the result
+against the real tokenizer, see calibrate().
+"""
+import math
+import os
+import re
+
+# longest word kept as one token, longer ones cost a token per this many chars
+WORD_CHARS = 6
+DIGITS_PER_TOKEN = 3
+# measured tokens / estimated tokens, fitted with calibrate()
+TOKEN_SCALE = float(os.getenv("TOKEN_SCALE", "1.0"))
+
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\x00-\x7f]|[^\w\s]")
+
+
+def _raw_count(text: str) -> int:
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        if piece.isascii() and piece[0].isalpha():
+            tokens += math.ceil(len(piece) / WORD_CHARS)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / DIGITS_PER_TOKEN)
+        else:
+            tokens += 1
+    return tokens
+
+
+def estimate_tokens(text) -> int:
+    """Token count of `text` (anything else is counted as its str())."""
+    text = text if isinstance(text, str) else str(text)
+    if not text:
+        return 0
+    return max(1, round(_raw_count(text) * TOKEN_SCALE))
+
+
+def item_tokens(item: dict) -> int:
+    """Tokens an info item costs in the prompt: its context plus its citation."""
+    return estimate_tokens(item["context"]) + estimate_tokens(item["citation"])
+
+
+def calibrate(samples) -> float:
+    """
+    Fit TOKEN_SCALE from (text, real token count) pairs, e.g. from the
+    model's count_tokens on a few scraped pages, and use it from now on.
+    """
+    global TOKEN_SCALE
+    estimated = sum(_raw_count(text) for text, _ in samples)
+    if estimated:
+        TOKEN_SCALE = sum(count for _, count in samples) / estimated
+    return TOKEN_SCALE
@@ -0,0 +1,59 @@
+"""
+URL helpers shared by the caches and the scrape pipeline.
+"""
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "si",
+    "ref", "ref_", "ref_src", "ref_url", "source", "share",
+    "from_search", "from_srp", "qid", "rank",
+}
+TRACKING_PREFIXES = ("utm_", "_hs")
+# host prefixes for mobile / vanity mirrors of the same site
+MIRROR_PREFIXES = ("www.", "m.", "mobile.")
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith(TRACKING_PREFIXES)
+
+
+def document_key(url: str) -> str:
+    """
+    Identity of the document behind a URL, for dedupe: ignores http vs https,
+    www./m. hosts, a trailing slash, tracking parameters and parameter order.
+    Not a fetchable URL.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    for prefix in MIRROR_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    # en.m.wikipedia.org style mobile hosts
+    host = host.replace(".m.", ".")
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)))
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def url_host(url: str) -> str:
+    """Host without a leading www., used for per-domain settings."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def match_domain(url: str, table: dict, default=None):
+    """Look up `url` in a {domain: value} table, matching parent domains too."""
+    host = url_host(url)
+    while host:
+        if host in table:
+            return table[host]
+        _, _, host = host.partition(".")
+    return default